@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+from audio_store import get_audio_store
+from config import ANNOUNCEMENT_MEMORY, ANNOUNCEMENT_LOG_DIR, ANNOUNCEMENT_PAGE_SIZE
+
+class Announcement:
+    """Metadata for one announcement; audio lives in the clip store and is referenced by hash"""
+    __slots__ = ("user", "text", "timestamp", "type", "audio_hash")
+    
+    def __init__(self, user, text, timestamp, type, audio_hash=None):
+        self.user = user
+        self.text = text
+        self.timestamp = timestamp
+        self.type = type
+        self.audio_hash = audio_hash
+    
+    @property
+    def time(self):
+        return self.timestamp.strftime("%H:%M:%S")
+    
+    @property
+    def audio(self):
+        """Lazy reference to the clip, or None"""
+        return get_audio_store().ref(self.audio_hash)
+    
+    def __getitem__(self, key):
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+    
+    def to_json(self):
+        """One JSONL line"""
+        return json.dumps({
+            "user": self.user, "text": self.text, "timestamp": self.timestamp.isoformat(),
+            "type": self.type, "audio_hash": self.audio_hash
+        }, ensure_ascii=False)
+    
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data["user"], data["text"], datetime.fromisoformat(data["timestamp"]), data["type"], data["audio_hash"])
+
+class AnnouncementLog:
+    """Fixed-size in-memory ring of recent announcements, spilling evicted ones to an append-only JSONL file"""
+    def __init__(self, owner, capacity=ANNOUNCEMENT_MEMORY, log_dir=ANNOUNCEMENT_LOG_DIR):
+        self.capacity = capacity
+        self.recent = deque()
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', owner)}.jsonl")
+        
+        # Byte offset of every spilled line, so any page can be read back with one seek per entry
+        self.offsets = array("q")
+        self.indexed_size = 0
+        self.lock = threading.Lock()
+    
+    def add(self, user, text, type, audio=None, timestamp=None):
+        """Record an announcement; audio goes to the clip store and only its hash is kept"""
+        audio_hash = get_audio_store().put(audio) if audio else None
+        announcement = Announcement(user, text, timestamp or datetime.now(), type, audio_hash)
+        with self.lock:
+            self.recent.append(announcement)
+            if len(self.recent) > self.capacity:
+                self._spill(self.recent.popleft())
+        return announcement
+    
+    def _spill(self, announcement):
+        """Append one evicted announcement to the on-disk log"""
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(announcement.to_json() + "\n")
+        except Exception as e:
+            print(f"Announcement spill failed: {e}")
+    
+    def _index(self):
+        """Index lines appended since the last call (by this or another session)"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self.indexed_size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A writer is mid-append; pick it up next time
+                self.offsets.append(offset)
+                offset += len(line)
+        self.indexed_size = offset
+    
+    def __len__(self):
+        with self.lock:
+            self._index()
+            return len(self.recent) + len(self.offsets)
+    
+    def page(self, page=0, page_size=ANNOUNCEMENT_PAGE_SIZE):
+        """Announcements newest first; pages past the in-memory ring are read back from disk"""
+        with self.lock:
+            self._index()
+            start = page * page_size
+            end = start + page_size
+            
+            in_memory = list(reversed(self.recent))[start:end]
+            spilled_start = max(0, start - len(self.recent))
+            spilled_end = max(0, end - len(self.recent))
+            positions = [len(self.offsets) - 1 - i for i in range(spilled_start, spilled_end)]
+            positions = [p for p in positions if p >= 0]
+            if not positions:
+                return in_memory
+            
+            spilled = []
+            with open(self.path, "rb") as f:
+                for position in positions:
+                    f.seek(self.offsets[position])
+                    spilled.append(Announcement.from_json(f.readline().decode("utf-8")))
+            return in_memory + spilled
+    
+    def page_count(self, page_size=ANNOUNCEMENT_PAGE_SIZE):
+        return max(1, -(-len(self) // page_size))
+    
+    def flush(self):
+        """Spill everything still in memory, e.g. at logout"""
+        with self.lock:
+            while self.recent:
+                self._spill(self.recent.popleft())
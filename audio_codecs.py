@@ -0,0 +1,309 @@
+import struct
+import warnings
+import numpy as np
+from io import BytesIO
+from config import AUDIO_CODEC, AUDIO_SPEECH_RATE
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+try:
+    # Standard library up to 3.12; the audioop-lts package provides it on 3.13+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+# Encoded clip header: magic, version, codec name, sample rate, channels, frames
+CLIP_MAGIC = b"ACLP"
+CLIP_HEADER = struct.Struct("<4sB7sIBI")
+
+# WAV layout: RIFF header, then (id, size) chunks; "fmt " holds PCM format, "data" the samples
+RIFF_HEADER = struct.Struct("<4sI4s")
+CHUNK_HEADER = struct.Struct("<4sI")
+FMT_CHUNK = struct.Struct("<HHIIHH")
+
+IMA_INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8, -1, -1, -1, -1, 2, 4, 6, 8]
+IMA_STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+]
+
+class Pcm16Codec:
+    """Uncompressed 16-bit samples (resampling only)"""
+    name = "pcm16"
+    
+    def encode(self, samples, sample_rate):
+        return samples.astype("<i2").tobytes()
+    
+    def decode(self, payload, frames, sample_rate):
+        return np.frombuffer(payload, dtype="<i2")[:frames]
+
+class MuLawCodec:
+    """8-bit logarithmic companding, 2:1"""
+    name = "mulaw"
+    MU = 255
+    
+    def encode(self, samples, sample_rate):
+        x = samples.astype(np.float32) / 32768.0
+        y = np.sign(x) * np.log1p(self.MU * np.abs(x)) / np.log1p(self.MU)
+        return np.round(y * 127).astype(np.int8).tobytes()
+    
+    def decode(self, payload, frames, sample_rate):
+        y = np.frombuffer(payload, dtype=np.int8)[:frames].astype(np.float32) / 127.0
+        x = np.sign(y) * np.expm1(np.abs(y) * np.log1p(self.MU)) / self.MU
+        return np.clip(x * 32768.0, -32768, 32767).astype(np.int16)
+
+def clamped_running_sum(increments, low, high, block=1024):
+    """x[n] = clip(x[n-1] + increments[n], low, high) from x[-1] = 0, as a blocked prefix scan
+    
+    Each step is the map x -> clip(x + a, l, h), and two such maps compose into
+    a third of the same form. A Hillis-Steele scan over (a, l, h) composes every
+    block's maps in log2(block) whole-array passes; a short loop then carries
+    the running value from one block to the next.
+    """
+    n = len(increments)
+    a = np.zeros(n + -n % block, dtype=np.int32)
+    a[:n] = increments
+    a = a.reshape(-1, block)
+    lo = np.full(a.shape, low, dtype=np.int32)
+    hi = np.full(a.shape, high, dtype=np.int32)
+    shift = 1
+    while shift < block:
+        # Compose the prefix ending shift elements back with the maps after it
+        later_lo, later_hi = lo[:, shift:], hi[:, shift:]
+        new_lo = np.clip(lo[:, :-shift] + a[:, shift:], later_lo, later_hi)
+        new_hi = np.clip(hi[:, :-shift] + a[:, shift:], later_lo, later_hi)
+        a[:, shift:] = a[:, :-shift] + a[:, shift:]
+        lo[:, shift:] = new_lo
+        hi[:, shift:] = new_hi
+        shift *= 2
+    
+    starts = np.empty((len(a), 1), dtype=np.int32)
+    x = 0
+    for i, (total, floor, ceiling) in enumerate(zip(a[:, -1].tolist(), lo[:, -1].tolist(), hi[:, -1].tolist())):
+        starts[i] = x
+        x = min(max(x + total, floor), ceiling)
+    return np.clip(a + starts, lo, hi).ravel()[:n]
+
+class AdpcmCodec:
+    """IMA ADPCM, 4 bits per sample (4:1), first sample in the high nibble
+    
+    Uses audioop's C coder when present (bit-identical); otherwise encoding
+    falls back to a Python loop and decoding to a vectorised prefix scan.
+    """
+    name = "adpcm"
+    INDEX_TABLE = np.array(IMA_INDEX_TABLE, dtype=np.int32)
+    STEP_TABLE = np.array(IMA_STEP_TABLE, dtype=np.int32)
+    
+    def encode(self, samples, sample_rate):
+        if audioop is None:
+            return self.encode_python(samples)
+        if len(samples) % 2:
+            samples = np.append(samples, samples[-1:])
+        return audioop.lin2adpcm(samples.astype(np.int16).tobytes(), 2, None)[0]
+    
+    def decode(self, payload, frames, sample_rate):
+        if audioop is None:
+            return self.decode_scan(payload, frames)
+        return np.frombuffer(audioop.adpcm2lin(payload, 2, None)[0], dtype=np.int16)[:frames]
+    
+    def encode_python(self, samples):
+        """Reference encoder; each code depends on the previous prediction, so it stays sequential"""
+        values = samples.tolist()
+        if len(values) % 2:
+            values.append(values[-1])
+        out = bytearray(len(values) // 2)
+        valpred, index = 0, 0
+        step = IMA_STEP_TABLE[0]
+        high = 0
+        for i, value in enumerate(values):
+            diff = value - valpred
+            sign = 8 if diff < 0 else 0
+            if sign:
+                diff = -diff
+            delta = 0
+            vpdiff = step >> 3
+            if diff >= step:
+                delta = 4
+                diff -= step
+                vpdiff += step
+            half = step >> 1
+            if diff >= half:
+                delta |= 2
+                diff -= half
+                vpdiff += half
+            quarter = step >> 2
+            if diff >= quarter:
+                delta |= 1
+                vpdiff += quarter
+            valpred = valpred - vpdiff if sign else valpred + vpdiff
+            valpred = -32768 if valpred < -32768 else 32767 if valpred > 32767 else valpred
+            delta |= sign
+            index += IMA_INDEX_TABLE[delta]
+            index = 0 if index < 0 else 88 if index > 88 else index
+            step = IMA_STEP_TABLE[index]
+            if i % 2 == 0:
+                high = delta << 4
+            else:
+                out[i // 2] = high | delta
+        return bytes(out)
+    
+    def decode_python(self, payload, frames):
+        """Reference decoder, one sample at a time"""
+        out = np.empty(len(payload) * 2, dtype=np.int16)
+        valpred, index = 0, 0
+        step = IMA_STEP_TABLE[0]
+        i = 0
+        for byte in payload:
+            for delta in (byte >> 4, byte & 0x0F):
+                index += IMA_INDEX_TABLE[delta]
+                index = 0 if index < 0 else 88 if index > 88 else index
+                vpdiff = step >> 3
+                if delta & 4:
+                    vpdiff += step
+                if delta & 2:
+                    vpdiff += step >> 1
+                if delta & 1:
+                    vpdiff += step >> 2
+                valpred = valpred - vpdiff if delta & 8 else valpred + vpdiff
+                valpred = -32768 if valpred < -32768 else 32767 if valpred > 32767 else valpred
+                step = IMA_STEP_TABLE[index]
+                out[i] = valpred
+                i += 1
+        return out[:frames]
+    
+    def decode_scan(self, payload, frames):
+        """Vectorised decoder: step-table lookups and both clamped accumulators as prefix scans"""
+        codes = np.frombuffer(payload, dtype=np.uint8)
+        deltas = np.empty(len(codes) * 2, dtype=np.int32)
+        deltas[0::2] = codes >> 4
+        deltas[1::2] = codes & 0x0F
+        deltas = deltas[:frames]
+        if not len(deltas):
+            return np.empty(0, dtype=np.int16)
+        
+        # Sample n is decoded with the step chosen after sample n-1
+        index = clamped_running_sum(self.INDEX_TABLE[deltas], 0, 88)
+        steps = self.STEP_TABLE[np.concatenate(([0], index[:-1]))]
+        vpdiff = ((steps >> 3) + np.where(deltas & 4, steps, 0)
+                  + np.where(deltas & 2, steps >> 1, 0) + np.where(deltas & 1, steps >> 2, 0))
+        vpdiff = np.where(deltas & 8, -vpdiff, vpdiff)
+        return clamped_running_sum(vpdiff, -32768, 32767).astype(np.int16)
+
+class FlacCodec:
+    """Lossless FLAC through soundfile"""
+    name = "flac"
+    
+    def encode(self, samples, sample_rate):
+        buffer = BytesIO()
+        soundfile.write(buffer, samples, sample_rate, format="FLAC", subtype="PCM_16")
+        return buffer.getvalue()
+    
+    def decode(self, payload, frames, sample_rate):
+        samples, _ = soundfile.read(BytesIO(payload), dtype="int16")
+        return samples[:frames]
+
+CODECS = {codec.name: codec for codec in (Pcm16Codec(), MuLawCodec(), AdpcmCodec())}
+if soundfile is not None:
+    CODECS[FlacCodec.name] = FlacCodec()
+
+def get_codec(name):
+    """Look up a registered codec"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown or unavailable audio codec: {name}")
+    return CODECS[name]
+
+def resample(samples, source_rate, target_rate):
+    """Resample mono int16 audio, low-pass filtering first when downsampling"""
+    if source_rate == target_rate or not len(samples):
+        return samples
+    x = samples.astype(np.float32)
+    if target_rate < source_rate:
+        # Windowed-sinc low-pass at the new Nyquist frequency to avoid aliasing
+        cutoff = 0.5 * target_rate / source_rate
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        x = np.convolve(x, kernel / kernel.sum(), mode="same")
+    count = int(round(len(x) * target_rate / source_rate))
+    positions = np.arange(count) * (source_rate / target_rate)
+    y = np.interp(positions, np.arange(len(x)), x)
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+def read_wav(audio):
+    """Samples and format of a 16-bit WAV given as bytes or a file-like object
+
+    Samples are a read-only view over the WAV data; nothing is copied.
+    """
+    if hasattr(audio, "getvalue"):
+        audio = audio.getvalue()
+    riff, _, form = RIFF_HEADER.unpack_from(audio)
+    if riff != b"RIFF" or form != b"WAVE":
+        raise ValueError("Not a WAV file")
+    
+    fmt = None
+    offset = RIFF_HEADER.size
+    while offset + CHUNK_HEADER.size <= len(audio):
+        chunk_id, size = CHUNK_HEADER.unpack_from(audio, offset)
+        offset += CHUNK_HEADER.size
+        if chunk_id == b"fmt ":
+            fmt = FMT_CHUNK.unpack_from(audio, offset)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data before format chunk")
+            audio_format, channels, sample_rate, _, _, bits = fmt
+            if audio_format != 1 or bits != 16:
+                raise ValueError("Only 16-bit PCM audio is supported")
+            size = min(size, len(audio) - offset) // 2 * 2
+            return np.frombuffer(audio, dtype="<i2", count=size // 2, offset=offset), sample_rate, channels
+        offset += size + (size & 1)
+    raise ValueError("WAV has no data chunk")
+
+def write_wav(samples, sample_rate, channels=1):
+    """Wrap int16 samples in an in-memory WAV with a single copy"""
+    samples = np.ascontiguousarray(samples, dtype="<i2")
+    size = samples.nbytes
+    header = b"".join((
+        RIFF_HEADER.pack(b"RIFF", 36 + size, b"WAVE"),
+        CHUNK_HEADER.pack(b"fmt ", FMT_CHUNK.size),
+        FMT_CHUNK.pack(1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16),
+        CHUNK_HEADER.pack(b"data", size),
+    ))
+    return b"".join((header, memoryview(samples).cast("B")))
+
+def is_encoded(data):
+    """Whether data is an encoded clip rather than a WAV"""
+    return bytes(data[:4]) == CLIP_MAGIC
+
+def encode_clip(audio, codec=AUDIO_CODEC, sample_rate=AUDIO_SPEECH_RATE):
+    """Downsample a WAV to speech rate and compress it into a self-describing clip"""
+    samples, source_rate, channels = read_wav(audio)
+    if channels > 1:
+        # Voice messages are mono; average interleaved channels
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    samples = resample(samples, source_rate, sample_rate)
+    codec = get_codec(codec)
+    header = CLIP_HEADER.pack(CLIP_MAGIC, 1, codec.name.encode(), sample_rate, 1, len(samples))
+    return header + codec.encode(samples, sample_rate)
+
+def decode_clip(data, sample_rate=None):
+    """Decode a clip back to WAV bytes, optionally resampled; WAVs pass through unchanged"""
+    if hasattr(data, "getvalue"):
+        data = data.getvalue()
+    if not is_encoded(data):
+        return data
+    _, _, name, clip_rate, channels, frames = CLIP_HEADER.unpack_from(data)
+    codec = get_codec(name.rstrip(b"\0").decode())
+    samples = codec.decode(bytes(data[CLIP_HEADER.size:]), frames, clip_rate)
+    if sample_rate:
+        samples = resample(samples, clip_rate, sample_rate)
+        clip_rate = sample_rate
+    return write_wav(samples, clip_rate, channels)
@@ -0,0 +1,144 @@
+import numpy as np
+from audio_codecs import decode_clip, read_wav, resample, write_wav
+from config import AUDIO_FADE_SECONDS, AUDIO_MIX_PEAK
+
+class Tone:
+    """One or more sine partials played together, with an optional exponential decay"""
+    __slots__ = ("frequencies", "duration", "gain", "decay")
+    
+    def __init__(self, frequencies, duration, gain=1.0, decay=None):
+        self.frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float32))
+        self.duration = duration
+        self.gain = gain
+        self.decay = decay
+    
+    def length(self, sample_rate):
+        return int(sample_rate * self.duration)
+    
+    def render_into(self, out, sample_rate):
+        """Write the tone into out (float32, full scale 1.0)"""
+        t = np.arange(len(out), dtype=np.float32) / sample_rate
+        # All partials in one outer product, averaged so chords do not clip
+        np.sin(np.outer(self.frequencies * np.float32(2 * np.pi), t), dtype=np.float32).mean(axis=0, out=out)
+        if self.decay:
+            out *= np.exp(-t / self.decay)
+        out *= self.gain
+
+class Silence:
+    """A gap between segments"""
+    __slots__ = ("duration",)
+    
+    def __init__(self, duration):
+        self.duration = duration
+    
+    def length(self, sample_rate):
+        return int(sample_rate * self.duration)
+    
+    def render_into(self, out, sample_rate):
+        out.fill(0)
+
+class Clip:
+    """Existing audio (WAV, encoded clip or stored reference) decoded once into samples"""
+    __slots__ = ("audio", "gain", "_samples", "_rate")
+    
+    def __init__(self, audio, gain=1.0):
+        self.audio = audio
+        self.gain = gain
+        self._samples = None
+        self._rate = None
+    
+    def _load(self, sample_rate):
+        if self._rate != sample_rate:
+            samples, rate, channels = read_wav(decode_clip(self.audio))
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            self._samples = resample(samples, rate, sample_rate)
+            self._rate = sample_rate
+        return self._samples
+    
+    def length(self, sample_rate):
+        return len(self._load(sample_rate))
+    
+    def render_into(self, out, sample_rate):
+        np.multiply(self._load(sample_rate), np.float32(self.gain / 32768.0), out=out, casting="unsafe")
+
+def chime(base=660, duration=0.6):
+    """Two-note doorbell chime"""
+    return [Tone([base, base * 1.5], duration / 2, decay=duration / 4),
+            Tone([base * 0.75, base * 1.125], duration / 2, decay=duration / 4)]
+
+def _fade(view, samples):
+    """Linear fade in and out over the first/last samples of view, in place"""
+    samples = min(samples, len(view) // 2)
+    if samples:
+        ramp = np.linspace(0, 1, samples, endpoint=False, dtype=np.float32)
+        view[:samples] *= ramp
+        view[-samples:] *= ramp[::-1]
+
+class Mixer:
+    """Renders segment lists into one preallocated buffer with no intermediate WAV encodes"""
+    def __init__(self, sample_rate=44100, fade=AUDIO_FADE_SECONDS, peak=AUDIO_MIX_PEAK):
+        self.sample_rate = sample_rate
+        self.fade = fade
+        self.peak = peak
+        # Synthesised tones repeat across announcements (every chime is the same), so render each once
+        self._tones = {}
+    
+    def _render_segment(self, segment, view, fade):
+        """Render a segment into view, reusing an identical tone rendered earlier"""
+        if not isinstance(segment, Tone):
+            segment.render_into(view, self.sample_rate)
+            _fade(view, fade)
+            return
+        key = (segment.frequencies.tobytes(), segment.duration, segment.gain, segment.decay)
+        rendered = self._tones.get(key)
+        if rendered is None:
+            segment.render_into(view, self.sample_rate)
+            _fade(view, fade)
+            if len(self._tones) < 64:
+                self._tones[key] = view.copy()
+        else:
+            view[:] = rendered
+    
+    def render_batch(self, announcements, normalize=True):
+        """Render several segment lists in one pass; returns one int16 array view per announcement"""
+        lengths = [[segment.length(self.sample_rate) for segment in segments] for segments in announcements]
+        totals = [sum(parts) for parts in lengths]
+        work = np.empty(sum(totals), dtype=np.float32)
+        pcm = np.empty(len(work), dtype=np.int16)
+        fade = int(self.sample_rate * self.fade)
+        
+        views = []
+        offset = 0
+        for segments, parts, total in zip(announcements, lengths, totals):
+            announcement = work[offset:offset + total]
+            position = 0
+            for segment, length in zip(segments, parts):
+                self._render_segment(segment, announcement[position:position + length], fade)
+                position += length
+            
+            # Gain normalisation and int16 conversion share a single pass
+            scale = 32767
+            if normalize and total:
+                peak = max(announcement.max(), -announcement.min())
+                if peak > 0:
+                    scale = 32767 * self.peak / peak
+            elif total:
+                np.clip(announcement, -1, 1, out=announcement)
+            view = pcm[offset:offset + total]
+            np.multiply(announcement, scale, out=view, casting="unsafe")
+            views.append(view)
+            offset += total
+        return views
+    
+    def render(self, segments, normalize=True):
+        """Render one segment list to int16 samples"""
+        return self.render_batch([segments], normalize)[0]
+    
+    def render_wav(self, segments, normalize=True):
+        """Render one segment list to WAV bytes"""
+        return write_wav(self.render(segments, normalize), self.sample_rate)
+    
+    def render_batch_wav(self, announcements, normalize=True):
+        """Render several segment lists in one pass to WAV bytes each"""
+        return [write_wav(samples, self.sample_rate) for samples in self.render_batch(announcements, normalize)]
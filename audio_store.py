@@ -0,0 +1,87 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from config import AUDIO_STORE_DIR
+
+class AudioRef:
+    """Lazy handle to a stored clip; nothing is read until playback asks for it"""
+    __slots__ = ("store", "digest")
+    
+    def __init__(self, store, digest):
+        self.store = store
+        self.digest = digest
+    
+    def open(self):
+        """Open the clip as a binary stream"""
+        return self.store.open(self.digest)
+    
+    def getvalue(self):
+        """Read the whole clip (BytesIO-compatible)"""
+        return self.store.get(self.digest)
+    
+    def __repr__(self):
+        return f"AudioRef({self.digest[:12]})"
+
+class AudioStore:
+    """Content-addressed audio clips on local disk, so identical clips are stored once"""
+    def __init__(self, root=AUDIO_STORE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _path(self, digest):
+        """Two-level fan-out keeps directories small"""
+        return os.path.join(self.root, digest[:2], f"{digest}.wav")
+    
+    def put(self, audio):
+        """Store a clip (bytes, memoryview or file-like) and return its sha256 hex digest"""
+        if isinstance(audio, AudioRef):
+            return audio.digest
+        if hasattr(audio, "getvalue"):
+            audio = audio.getvalue()
+        
+        digest = hashlib.sha256(audio).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # Write then rename so readers never see a partial clip
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        return digest
+    
+    def exists(self, digest):
+        """Whether a clip is stored"""
+        return os.path.exists(self._path(digest))
+    
+    def open(self, digest):
+        """Open a clip as a binary stream"""
+        return open(self._path(digest), "rb")
+    
+    def get(self, digest):
+        """Read a whole clip"""
+        with self.open(digest) as f:
+            return f.read()
+    
+    def ref(self, digest):
+        """Lazy reference to a stored clip, or None for no audio"""
+        return AudioRef(self, digest) if digest else None
+    
+    def copy_to(self, digest, dst):
+        """Stream a clip into a writable file object"""
+        with self.open(digest) as f:
+            shutil.copyfileobj(f, dst)
+
+_audio_store = None
+_audio_store_lock = threading.Lock()
+
+def get_audio_store():
+    """Process-wide audio store"""
+    global _audio_store
+    with _audio_store_lock:
+        if _audio_store is None:
+            _audio_store = AudioStore()
+        return _audio_store
@@ -1,98 +1,149 @@
-import wave
-import pyaudio
-import pygame
-import time
-import numpy as np
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from io import BytesIO
+from audio_codecs import encode_clip
+from audio_mix import Clip, Mixer, Silence, Tone, chime
+from capture import get_audio_capture
+from playback import PRIORITY_BROADCAST, get_playback_service
+from tts import get_tts
+from config import AUDIO_CLIP_CACHE_SIZE, AUDIO_PREWARM_BEEPS, AUDIO_PREWARM_PHRASES
+
+class ClipCache:
+    """LRU cache of generated WAV clips keyed by (frequency, duration, sample rate, text)"""
+    def __init__(self, max_size=AUDIO_CLIP_CACHE_SIZE):
+        self.max_size = max_size
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, build):
+        """Return the cached clip for key, building it on a miss"""
+        with self._lock:
+            clip = self._clips.get(key)
+            if clip is not None:
+                self._clips.move_to_end(key)
+                self.hits += 1
+                return clip
+            self.misses += 1
+        # Build outside the lock; a racing duplicate build is harmless
+        clip = bytes(build())
+        with self._lock:
+            self._clips[key] = clip
+            self._clips.move_to_end(key)
+            while len(self._clips) > self.max_size:
+                self._clips.popitem(last=False)
+        return clip
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._clips
+    
+    def clear(self):
+        """Drop every cached clip"""
+        with self._lock:
+            self._clips.clear()
+    
+    def metrics(self):
+        """Snapshot of cache size and hit counters"""
+        with self._lock:
+            return {
+                "clips": len(self._clips),
+                "bytes": sum(len(clip) for clip in self._clips.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+_clip_cache = None
+_clip_cache_lock = threading.Lock()
+
+def get_clip_cache():
+    """Process-wide clip cache shared by every session's AudioSystem"""
+    global _clip_cache
+    with _clip_cache_lock:
+        if _clip_cache is None:
+            _clip_cache = ClipCache()
+        return _clip_cache
 
 class AudioSystem:
-    def __init__(self):
+    def __init__(self, prewarm=True, capture=None):
         self.sample_rate = 44100
         self.channels = 1
         self.chunk = 1024
+        self.clips = get_clip_cache()
+        self.mixer = Mixer(self.sample_rate)
+        self.tts = get_tts()
+        # The microphone stays open across recordings instead of reopening PyAudio each time
+        self.capture = capture or get_audio_capture()
+        if prewarm:
+            self.prewarm()
+    
+    def prewarm(self):
+        """Synthesise the common clips up front so the UI never waits on them"""
+        for duration in AUDIO_PREWARM_BEEPS:
+            self.clip(duration=float(duration))
+        # Speech is slower; let the TTS pool fill the cache in the background
+        for phrase in AUDIO_PREWARM_PHRASES:
+            self.speech_future(phrase)
+    
+    def clip(self, frequency=440, duration=1.0):
+        """Immutable WAV bytes for a beep, served from the shared cache"""
+        key = (frequency, float(duration), self.sample_rate, None)
+        return self.clips.get(key, lambda: self._render_beep(frequency, duration))
+    
+    def clip_view(self, frequency=440, duration=1.0):
+        """Zero-copy read-only view of a cached clip"""
+        return memoryview(self.clip(frequency, duration))
+    
+    def speech_clip(self, text, language='en'):
+        """Immutable WAV bytes for an announcement (blocking)"""
+        key = ("speech", self.tts.cache_key(text, language))
+        return self.clips.get(key, lambda: self.tts.synthesize(text, language))
+    
+    def speech_future(self, text, language='en'):
+        """Synthesise an announcement on the TTS pool; Future resolving to WAV bytes"""
+        if ("speech", self.tts.cache_key(text, language)) in self.clips:
+            future = Future()
+            future.set_result(self.speech_clip(text, language))
+            return future
+        return self.tts.submit(text, language, synthesize=self.speech_clip)
         
     def text_to_speech(self, text, language='en'):
-        """Convert text to speech (simulated)"""
-        # For simulation, create a simple beep sound
-        return self.generate_beep_sound()
+        """Convert text to speech"""
+        return BytesIO(self.speech_clip(text, language))
     
     def generate_beep_sound(self, frequency=440, duration=1.0):
         """Generate a simple beep sound"""
-        samples = int(self.sample_rate * duration)
-        t = np.linspace(0, duration, samples, False)
-        tone = np.sin(frequency * t * 2 * np.pi)
-        
-        # Convert to 16-bit PCM
-        audio = (tone * 32767).astype(np.int16)
-        
-        # Create WAV file in memory
-        wav_buffer = BytesIO()
-        with wave.open(wav_buffer, 'wb') as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(self.sample_rate)
-            wf.writeframes(audio.tobytes())
-        
-        wav_buffer.seek(0)
-        return wav_buffer
+        # BytesIO shares the immutable cached bytes until someone writes to it
+        return BytesIO(self.clip(frequency, duration))
+    
+    def _render_beep(self, frequency, duration):
+        """Synthesise a sine beep as WAV bytes"""
+        return self.mixer.render_wav([Tone(frequency, duration)])
+    
+    def compose_announcement(self, voice, with_chime=True):
+        """Chime + voice + chime rendered straight into one WAV"""
+        return BytesIO(self.render_announcements([voice], with_chime)[0])
+    
+    def render_announcements(self, voices, with_chime=True):
+        """Render several announcements in a single mixing pass; WAV bytes each"""
+        bell = chime() if with_chime else []
+        return self.mixer.render_batch_wav([bell + [Clip(voice), Silence(0.1)] + bell for voice in voices])
     
     def record_audio(self, duration=5):
         """Record audio from microphone"""
         try:
-            p = pyaudio.PyAudio()
-            stream = p.open(
-                format=pyaudio.paInt16,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
-            
-            frames = []
-            for _ in range(0, int(self.sample_rate / self.chunk * duration)):
-                data = stream.read(self.chunk)
-                frames.append(data)
-            
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-            # Save to WAV buffer
-            wav_buffer = BytesIO()
-            with wave.open(wav_buffer, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(frames))
-            
-            wav_buffer.seek(0)
-            return wav_buffer
-            
+            # Voice is stored at speech rate in a compressed clip; playback decodes it
+            return BytesIO(encode_clip(self.capture.record(duration)))
         except Exception as e:
             print(f"Audio recording failed: {e}")
             return None
     
-    def play_audio(self, audio_bytes):
-        """Play audio from bytes"""
-        try:
-            pygame.mixer.init(frequency=self.sample_rate)
-            
-            # Save to temp file
-            temp_file = "temp_audio.wav"
-            with open(temp_file, 'wb') as f:
-                if isinstance(audio_bytes, BytesIO):
-                    f.write(audio_bytes.getvalue())
-                else:
-                    f.write(audio_bytes)
-            
-            pygame.mixer.music.load(temp_file)
-            pygame.mixer.music.play()
-            
-            # Wait for playback
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-            
-            return True
-        except Exception as e:
-            print(f"Audio playback failed: {e}")
-            return False
+    def stream_audio(self, start=None):
+        """Iterate over live microphone samples as they arrive"""
+        return self.capture.chunks(start)
+    
+    def play_audio(self, audio_bytes, priority=PRIORITY_BROADCAST, label=None):
+        """Queue audio for playback; returns a Future resolving to True once played"""
+        return get_playback_service().submit(audio_bytes, priority, label)
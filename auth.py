@@ -0,0 +1,183 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (AUTH_KDF, AUTH_PBKDF2_ITERATIONS, AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P,
+                    AUTH_WORKERS, AUTH_CACHE_TTL, AUTH_CACHE_SIZE)
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+def hash_password(password, kdf=AUTH_KDF):
+    """Salted KDF hash encoded as "<scheme>$<params>$<salt>$<hash>" for the password_hash column"""
+    salt = os.urandom(16)
+    if kdf == "pbkdf2_sha256":
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, AUTH_PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${AUTH_PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+    if kdf == "scrypt":
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=AUTH_SCRYPT_N, r=AUTH_SCRYPT_R, p=AUTH_SCRYPT_P,
+                                maxmem=256 * AUTH_SCRYPT_N * AUTH_SCRYPT_R, dklen=32)
+        return f"scrypt${AUTH_SCRYPT_N}${AUTH_SCRYPT_R}${AUTH_SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    raise ValueError(f"Unknown password KDF: {kdf}")
+
+def verify_password(password, stored, kdf=AUTH_KDF):
+    """Check password against a stored hash; returns (ok, needs_rehash)
+
+    Rows created before hashing hold the plain password; they verify once and
+    are flagged for rehashing, as are hashes made with an older cost or KDF.
+    """
+    parts = stored.split("$")
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        iterations = int(parts[1])
+        expected = base64.b64decode(parts[3])
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(parts[2]), iterations)
+        ok = hmac.compare_digest(digest, expected)
+        return ok, ok and (kdf != "pbkdf2_sha256" or iterations != AUTH_PBKDF2_ITERATIONS)
+    if parts[0] == "scrypt" and len(parts) == 6:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        expected = base64.b64decode(parts[5])
+        digest = hashlib.scrypt(password.encode(), salt=base64.b64decode(parts[4]), n=n, r=r, p=p,
+                                maxmem=256 * n * r, dklen=len(expected))
+        ok = hmac.compare_digest(digest, expected)
+        return ok, ok and (kdf != "scrypt" or (n, r, p) != (AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P))
+    ok = hmac.compare_digest(stored.encode(), password.encode())
+    return ok, ok
+
+class Authenticator:
+    """Password checks on a thread pool with a short-lived positive cache in front of MySQL"""
+    def __init__(self, pool, kdf=AUTH_KDF, workers=AUTH_WORKERS, ttl=AUTH_CACHE_TTL, cache_size=AUTH_CACHE_SIZE):
+        self.pool = pool
+        self.kdf = kdf
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        
+        # username -> (keyed digest of the password, expiry); the key never leaves this process
+        self.cache = OrderedDict()
+        self.secret = os.urandom(32)
+        self.lock = threading.Lock()
+        # Unknown users still pay for one KDF run so timing does not reveal which names exist
+        self.dummy_hash = hash_password(os.urandom(16).hex(), kdf)
+        
+        # Metrics
+        self.cache_hits = 0
+        self.kdf_runs = 0
+        self.kdf_total = 0.0
+        self.rehashed = 0
+    
+    def _cache_token(self, password):
+        return hmac.new(self.secret, password.encode(), hashlib.sha256).digest()
+    
+    def _cached(self, username, password):
+        """Whether this username/password pair verified within the TTL"""
+        with self.lock:
+            entry = self.cache.get(username)
+            if entry is None:
+                return False
+            token, expires = entry
+            if expires < time.monotonic():
+                del self.cache[username]
+                return False
+            if not hmac.compare_digest(token, self._cache_token(password)):
+                return False
+            self.cache.move_to_end(username)
+            self.cache_hits += 1
+            return True
+    
+    def _remember(self, username, password):
+        with self.lock:
+            self.cache[username] = (self._cache_token(password), time.monotonic() + self.ttl)
+            self.cache.move_to_end(username)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+    
+    def invalidate(self, username):
+        """Forget a cached login, e.g. after a password change"""
+        with self.lock:
+            self.cache.pop(username, None)
+    
+    def _verify(self, password, stored):
+        started = time.perf_counter()
+        result = verify_password(password, stored, self.kdf)
+        with self.lock:
+            self.kdf_runs += 1
+            self.kdf_total += time.perf_counter() - started
+        return result
+    
+    def _authenticate(self, username, password):
+        """Worker: cache, then hash-only lookup by username, then KDF verify"""
+        if self._cached(username, password):
+            return True
+        
+        with self.pool.connection() as db_conn:
+            cursor = db_conn.cursor()
+            cursor.execute("SELECT password_hash FROM users WHERE username=%s", (username,))
+            row = cursor.fetchone()
+        
+        if row is None:
+            self._verify(password, self.dummy_hash)
+            return False
+        ok, needs_rehash = self._verify(password, row[0])
+        if not ok:
+            return False
+        
+        if needs_rehash:
+            try:
+                with self.pool.connection() as db_conn:
+                    cursor = db_conn.cursor()
+                    cursor.execute(
+                        "UPDATE users SET password_hash=%s WHERE username=%s",
+                        (hash_password(password, self.kdf), username)
+                    )
+                    db_conn.commit()
+                self.rehashed += 1
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+        self._remember(username, password)
+        return True
+    
+    def authenticate_async(self, username, password):
+        """Future resolving to whether the credentials are valid"""
+        return self.executor.submit(self._authenticate, username, password)
+    
+    def authenticate(self, username, password):
+        """Whether the credentials are valid (waits for the worker)"""
+        return self.authenticate_async(username, password).result()
+    
+    def register(self, username, password):
+        """Create a user with a hashed password; MySQL errors (e.g. 1062 duplicate) propagate"""
+        password_hash = self.executor.submit(hash_password, password, self.kdf).result()
+        with self.pool.connection() as db_conn:
+            cursor = db_conn.cursor()
+            cursor.execute("INSERT INTO users (username, password_hash) VALUES (%s, %s)", (username, password_hash))
+            db_conn.commit()
+        self.invalidate(username)
+    
+    def metrics(self):
+        """Snapshot of cache and KDF counters"""
+        with self.lock:
+            return {
+                "cached_users": len(self.cache),
+                "cache_hits": self.cache_hits,
+                "kdf_runs": self.kdf_runs,
+                "kdf_avg_ms": round(self.kdf_total / self.kdf_runs * 1000, 1) if self.kdf_runs else 0.0,
+                "rehashed": self.rehashed,
+            }
+    
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+_authenticator = None
+_authenticator_lock = threading.Lock()
+
+def get_authenticator(pool):
+    """Process-wide authenticator sharing one verification pool and login cache"""
+    global _authenticator
+    with _authenticator_lock:
+        if _authenticator is None:
+            _authenticator = Authenticator(pool)
+        return _authenticator
@@ -0,0 +1,60 @@
+"""Benchmark IMA ADPCM voice-message coding: Python loops vs prefix-scan decode vs audioop.
+
+The Python loops are the reference coder AdpcmCodec falls back to; decode_scan
+is the vectorised fallback decoder, and audioop (when importable) is the C
+coder used by default. Every path is checked to be bit-identical first.
+
+    python bench_audio_codecs.py --seconds 10 --rate 16000
+"""
+import argparse
+import time
+import numpy as np
+import audio_codecs
+from audio_codecs import AdpcmCodec
+
+def best_of(fn, repeats):
+    """Fastest wall time of repeats runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=int, default=16000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    # Speech-like test signal: a wandering tone with noise
+    frames = int(args.seconds * args.rate)
+    rng = np.random.default_rng(0)
+    t = np.arange(frames) / args.rate
+    signal = np.sin(2 * np.pi * (200 + 50 * np.sin(2 * np.pi * t)) * t) * 12000 + rng.standard_normal(frames) * 2000
+    samples = np.clip(signal, -32768, 32767).astype(np.int16)
+
+    codec = AdpcmCodec()
+    payload = codec.encode_python(samples)
+    reference = codec.decode_python(payload, frames)
+    assert np.array_equal(codec.decode_scan(payload, frames), reference), "prefix-scan decode differs"
+
+    rows = [
+        ("encode python", best_of(lambda: codec.encode_python(samples), args.repeats)),
+        ("decode python", best_of(lambda: codec.decode_python(payload, frames), args.repeats)),
+        ("decode scan", best_of(lambda: codec.decode_scan(payload, frames), args.repeats)),
+    ]
+    if audio_codecs.audioop is not None:
+        assert codec.encode(samples, args.rate) == payload, "audioop encode differs"
+        assert np.array_equal(codec.decode(payload, frames, args.rate), reference), "audioop decode differs"
+        rows.append(("encode audioop", best_of(lambda: codec.encode(samples, args.rate), args.repeats)))
+        rows.append(("decode audioop", best_of(lambda: codec.decode(payload, frames, args.rate), args.repeats)))
+
+    print(f"{args.seconds:.1f}s of audio at {args.rate} Hz ({frames} samples)")
+    print(f"{'path':<18}{'total (ms)':>14}{'realtime x':>14}")
+    for name, ms in rows:
+        print(f"{name:<18}{ms:>14.2f}{args.seconds * 1000 / ms:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark login throughput under concurrent sessions: KDF pool sizes and the positive login cache.
+
+Seeds a scratch database (never the app database) with hashed users, then
+has N concurrent "sessions" log in repeatedly. Cold logins pay for the hash
+lookup and a KDF verify; warm logins are served by the TTL cache.
+
+    python bench_login.py --users 32 --sessions 16 --logins 64
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import mysql.connector
+from config import DB_CONFIG
+from auth import Authenticator, hash_password
+from database import ConnectionPool, migrate
+
+def seed(db_conn, users, workers):
+    """Insert users user0..userN with password "pw-<name>", hashed in parallel"""
+    names = [f"user{i}" for i in range(users)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = list(executor.map(lambda name: hash_password(f"pw-{name}"), names))
+    cursor = db_conn.cursor()
+    cursor.executemany("INSERT INTO users (username, password_hash) VALUES (%s, %s)", list(zip(names, hashes)))
+    db_conn.commit()
+    return names
+
+def run_sessions(auth, names, sessions, logins):
+    """Logins per second with sessions threads each logging in as random users"""
+    def session(_):
+        ok = 0
+        for _ in range(logins // sessions):
+            name = random.choice(names)
+            ok += auth.authenticate(name, f"pw-{name}")
+        return ok
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        ok = sum(executor.map(session, range(sessions)))
+    elapsed = time.perf_counter() - started
+    if ok != logins // sessions * sessions:
+        raise RuntimeError("Some logins failed")
+    return ok / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--database", default="assignment_bench")
+    args = parser.parse_args()
+    
+    server_config = {k: v for k, v in DB_CONFIG.items() if k != "database"}
+    conn = mysql.connector.connect(**server_config)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+    cursor.execute(f"CREATE DATABASE `{args.database}`")
+    conn.database = args.database
+    pool = ConnectionPool(size=args.sessions, db_config={**DB_CONFIG, "database": args.database})
+    
+    try:
+        migrate(conn)
+        print(f"Hashing and seeding {args.users} users...")
+        names = seed(conn, args.users, max(args.workers))
+        
+        print(f"{args.sessions} sessions, {args.logins} logins per run")
+        print(f"{'mode':<12}{'workers':>9}{'logins/s':>12}")
+        for workers in args.workers:
+            # ttl=0 disables the cache so every login runs the KDF
+            cold = Authenticator(pool, workers=workers, ttl=0)
+            print(f"{'cold':<12}{workers:>9}{run_sessions(cold, names, args.sessions, args.logins):>12.1f}")
+            cold.close()
+        
+        warm = Authenticator(pool, workers=max(args.workers))
+        run_sessions(warm, names, args.sessions, len(names) * 4)
+        print(f"{'cached':<12}{max(args.workers):>9}{run_sessions(warm, names, args.sessions, args.logins * 50):>12.1f}")
+        print(warm.metrics())
+        warm.close()
+    finally:
+        pool.close()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
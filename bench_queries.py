@@ -0,0 +1,92 @@
+"""Benchmark per-user reminder/activity queries before and after the index migration.
+
+Seeds a scratch database (never the app database), times the query API
+with only migrations 1-3 applied, applies the index migration and times
+again.
+
+    python bench_queries.py --rows 1000000 --users 500
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+import mysql.connector
+from config import DB_CONFIG
+from database import migrate, get_pending_reminders, get_activity
+
+INDEX_VERSION = 4
+
+def seed(db_conn, rows, users, batch=10000):
+    """Insert rows reminders and rows activity_log entries spread over users"""
+    cursor = db_conn.cursor()
+    start = datetime(2025, 1, 1)
+    statuses = ["pending", "triggered", "triggered", "cancelled"]
+    
+    for offset in range(0, rows, batch):
+        count = min(batch, rows - offset)
+        reminders = []
+        activity = []
+        for _ in range(count):
+            user = f"user{random.randrange(users)}"
+            when = start + timedelta(minutes=random.randrange(525600))
+            reminders.append((user, "Medicine", "Take your medicine", when, "once", random.choice(statuses)))
+            activity.append((user, "login", when))
+        cursor.executemany(
+            "INSERT INTO reminders (username, title, message, trigger_time, repeat_type, status) VALUES (%s, %s, %s, %s, %s, %s)",
+            reminders
+        )
+        cursor.executemany("INSERT INTO activity_log (username, activity, timestamp) VALUES (%s, %s, %s)", activity)
+        db_conn.commit()
+
+def time_queries(db_conn, users, repeats):
+    """Average milliseconds per call for each query"""
+    timings = {}
+    samples = [f"user{random.randrange(users)}" for _ in range(repeats)]
+    
+    started = time.perf_counter()
+    for user in samples:
+        get_pending_reminders(db_conn, user, limit=20)
+    timings["pending_reminders"] = (time.perf_counter() - started) / repeats * 1000
+    
+    started = time.perf_counter()
+    for user in samples:
+        get_activity(db_conn, user, datetime(2025, 3, 1), datetime(2025, 4, 1))
+    timings["activity_range"] = (time.perf_counter() - started) / repeats * 1000
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--database", default="assignment_bench")
+    args = parser.parse_args()
+    
+    server_config = {k: v for k, v in DB_CONFIG.items() if k != "database"}
+    conn = mysql.connector.connect(**server_config)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+    cursor.execute(f"CREATE DATABASE `{args.database}`")
+    conn.database = args.database
+    
+    try:
+        migrate(conn, target=INDEX_VERSION - 1)
+        print(f"Seeding {args.rows} reminders and {args.rows} activity rows...")
+        seed(conn, args.rows, args.users)
+        
+        before = time_queries(conn, args.users, args.repeats)
+        started = time.perf_counter()
+        migrate(conn, target=INDEX_VERSION)
+        index_build = time.perf_counter() - started
+        after = time_queries(conn, args.users, args.repeats)
+        
+        print(f"Index migration took {index_build:.1f}s")
+        print(f"{'query':<20}{'no index (ms)':>16}{'indexed (ms)':>16}{'speedup':>10}")
+        for name in before:
+            print(f"{name:<20}{before[name]:>16.2f}{after[name]:>16.2f}{before[name] / after[name]:>9.1f}x")
+    finally:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
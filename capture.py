@@ -0,0 +1,227 @@
+import threading
+import time
+import wave
+import numpy as np
+from io import BytesIO
+from config import AUDIO_CAPTURE_CHUNK, AUDIO_CAPTURE_BUFFER_SECONDS
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+class RingBuffer:
+    """Preallocated int16 sample ring addressed by absolute sample index"""
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=dtype)
+        self.written = 0
+        self.overruns = 0
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def write(self, samples):
+        """Append samples, overwriting the oldest once full"""
+        count = len(samples)
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+        with self.condition:
+            start = (self.written + count - len(samples)) % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:len(samples) - first] = samples[first:]
+            self.written += count
+            self.condition.notify_all()
+    
+    def read(self, start, max_samples=None, out=None):
+        """Copy samples from absolute index start; returns (samples, next index)"""
+        with self.condition:
+            oldest = max(0, self.written - self.capacity)
+            if start < oldest:
+                # The reader fell more than a buffer behind; skip to the oldest sample still held
+                self.overruns += 1
+                start = oldest
+            end = self.written if max_samples is None else min(self.written, start + max_samples)
+            count = max(0, end - start)
+            if out is None:
+                out = np.empty(count, dtype=self.buffer.dtype)
+            pos = start % self.capacity
+            first = min(count, self.capacity - pos)
+            out[:first] = self.buffer[pos:pos + first]
+            out[first:count] = self.buffer[:count - first]
+            return out[:count], start + count
+    
+    def wait(self, index, timeout=None):
+        """Block until samples past index exist; False on timeout or close"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.written > index or self.closed, timeout)
+            return self.written > index
+    
+    def close(self):
+        """Wake every waiting reader"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class PyAudioInput:
+    """Default microphone, opened once in callback mode"""
+    def __init__(self):
+        self.pa = None
+    
+    def open(self, rate, channels, chunk, callback):
+        """Start a callback-driven input stream feeding raw int16 bytes to callback"""
+        if pyaudio is None:
+            raise RuntimeError("pyaudio is not installed; pass a FakeInputDevice to capture without a microphone")
+        if self.pa is None:
+            self.pa = pyaudio.PyAudio()
+        
+        def on_input(in_data, frame_count, time_info, status):
+            callback(in_data)
+            return None, pyaudio.paContinue
+        
+        stream = self.pa.open(
+            format=pyaudio.paInt16,
+            channels=channels,
+            rate=rate,
+            input=True,
+            frames_per_buffer=chunk,
+            stream_callback=on_input
+        )
+        stream.start_stream()
+        return stream
+    
+    def close(self, stream):
+        """Stop the stream and release PortAudio"""
+        stream.stop_stream()
+        stream.close()
+        if self.pa is not None:
+            self.pa.terminate()
+            self.pa = None
+
+class FakeInputDevice:
+    """Synthetic input device feeding a sine tone (or custom samples) through the same callback path"""
+    def __init__(self, frequency=440, amplitude=0.5, samples=None, realtime=True):
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.samples = samples
+        self.realtime = realtime
+        self.running = False
+        self.thread = None
+    
+    def _generate(self, rate, channels, chunk, callback):
+        """Emit one chunk of PCM per period until closed"""
+        produced = 0
+        period = chunk / rate
+        next_time = time.monotonic()
+        while self.running:
+            if self.samples is not None:
+                block = np.take(self.samples, np.arange(produced, produced + chunk), mode="wrap")
+            else:
+                t = np.arange(produced, produced + chunk) / rate
+                block = self.amplitude * 32767 * np.sin(2 * np.pi * self.frequency * t)
+            block = np.repeat(block.astype(np.int16), channels)
+            callback(block.tobytes())
+            produced += chunk
+            if self.realtime:
+                next_time += period
+                time.sleep(max(0.0, next_time - time.monotonic()))
+    
+    def open(self, rate, channels, chunk, callback):
+        """Start generating PCM on a background thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._generate, args=(rate, channels, chunk, callback), daemon=True)
+        self.thread.start()
+        return self.thread
+    
+    def close(self, stream):
+        """Stop generating"""
+        self.running = False
+        stream.join(timeout=1)
+
+class AudioCapture:
+    """Persistent microphone stream written into a ring buffer and read incrementally"""
+    def __init__(self, sample_rate=44100, channels=1, chunk=AUDIO_CAPTURE_CHUNK,
+                 buffer_seconds=AUDIO_CAPTURE_BUFFER_SECONDS, device=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk = chunk
+        self.device = device or PyAudioInput()
+        self.ring = RingBuffer(int(sample_rate * buffer_seconds) * channels)
+        self.stream = None
+        self.lock = threading.Lock()
+    
+    @property
+    def running(self):
+        return self.stream is not None
+    
+    @property
+    def position(self):
+        """Absolute index of the next sample to arrive"""
+        return self.ring.written
+    
+    def start(self):
+        """Open the input stream if it is not already running"""
+        with self.lock:
+            if self.stream is None:
+                self.ring.closed = False
+                self.stream = self.device.open(self.sample_rate, self.channels, self.chunk, self._on_chunk)
+    
+    def _on_chunk(self, data):
+        """Input callback: copy the chunk into the ring without allocating a list entry"""
+        self.ring.write(np.frombuffer(data, dtype=np.int16))
+    
+    def chunks(self, start=None, timeout=1.0):
+        """Yield sample arrays as they arrive, starting now or at an absolute index"""
+        self.start()
+        index = self.position if start is None else start
+        while self.running:
+            if not self.ring.wait(index, timeout):
+                continue
+            samples, index = self.ring.read(index)
+            if len(samples):
+                yield samples
+    
+    def read(self, duration, start=None):
+        """Collect duration seconds of samples into one preallocated array"""
+        needed = int(self.sample_rate * duration) * self.channels
+        out = np.empty(needed, dtype=np.int16)
+        filled = 0
+        self.start()
+        index = self.position if start is None else start
+        while filled < needed and self.running:
+            if not self.ring.wait(index, 1.0):
+                continue
+            samples, index = self.ring.read(index, needed - filled, out[filled:])
+            filled += len(samples)
+        return out[:filled]
+    
+    def record(self, duration):
+        """Capture duration seconds as an in-memory WAV"""
+        samples = self.read(duration)
+        wav_buffer = BytesIO()
+        with wave.open(wav_buffer, 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(samples.tobytes())
+        wav_buffer.seek(0)
+        return wav_buffer
+    
+    def stop(self):
+        """Close the input stream and release waiting readers"""
+        with self.lock:
+            stream, self.stream = self.stream, None
+        self.ring.close()
+        if stream is not None:
+            self.device.close(stream)
+
+_audio_capture = None
+_audio_capture_lock = threading.Lock()
+
+def get_audio_capture():
+    """Process-wide capture stream so the microphone is opened once"""
+    global _audio_capture
+    with _audio_capture_lock:
+        if _audio_capture is None:
+            _audio_capture = AudioCapture()
+        return _audio_capture
@@ -11,6 +11,73 @@ DB_CONFIG = {
     "password": "root",
     "database": "assignment_new"
 }
+DB_POOL_SIZE = 5  # Connections shared by every Streamlit session in this process
+DB_POOL_TIMEOUT = 5.0  # Seconds to wait for a free pooled connection
+DB_CONNECT_TIMEOUT = 5  # Seconds to wait when opening a new MySQL connection
+DB_WRITE_QUEUE_SIZE = 1000  # Queued writes before callers are made to wait
+DB_WRITE_QUEUE_BYTES = 64 * 1024 * 1024  # Queued BLOB bytes before callers are made to wait
+DB_WRITE_BATCH_SIZE = 100  # Rows per write-behind transaction
+DB_WRITE_FLUSH_INTERVAL = 0.5  # Seconds the writer waits to collect a batch
+DB_WRITE_RETRIES = 5  # Times a failed batch is retried before it is dropped
+DB_WRITE_RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubling per attempt
+DB_WRITE_RETRY_BACKOFF_MAX = 30.0  # Upper bound on the wait between retries
+REMINDER_LOAD_PAGE_SIZE = 500  # Rows per page when reloading pending reminders at login
+DB_WRITE_TIMEOUT = 2.0  # Seconds a caller blocks on a full queue before the write is rejected
+DB_STATUS_TTL = 30  # Seconds a MySQL reachability probe is reused across reruns
 
 # System Configuration
 TIMEZONE = ZoneInfo("Asia/Kuala_Lumpur")
+REMINDER_EVENT_BACKLOG = 100  # Fired reminders kept per session until its next rerun
+
+# Motion Detection Configuration
+MOTION_ANALYSIS_SIZE = (320, 180)  # (width, height) of the proxy frame, None for full resolution
+MOTION_FRAME_SKIP = 3  # Analyse every Nth frame, reuse the last boxes in between
+MOTION_MIN_AREA = 1000  # Minimum contour area in full-resolution pixels
+MOTION_ENGINE = "frame_diff"  # "frame_diff", "running_average" or "mog2"
+MOTION_DIFF_THRESHOLD = 25  # Grey-level change that counts as motion
+MOTION_BACKGROUND_ALPHA = 0.02  # Learning rate of the background model
+MOTION_BUFFER_POOL = True  # Reuse working arrays across frames instead of allocating per frame
+MOTION_ASYNC_ANALYSIS = True  # Analyse on a worker thread; recv overlays the latest result
+MOTION_QUEUE_SIZE = 2  # Frames waiting for the analysis worker
+MOTION_DROP_POLICY = "drop_oldest"  # "drop_oldest" or "drop_newest" when the queue is full
+MOTION_SHARED_ENGINE = False  # Batch every camera stream through one shared MultiCameraEngine (frame differencing only; MOTION_ENGINE is ignored)
+MULTI_CAMERA_WORKERS = None  # Threads for contour extraction, None for all cores
+MULTI_CAMERA_BATCH_INTERVAL = 0.1  # Seconds between batched analysis passes
+MOTION_EPISODE_GAP = 3.0  # Seconds without motion that close a motion episode
+MOTION_EPISODE_MAX = 300.0  # Episodes longer than this many seconds are split
+MOTION_EVENT_BUFFER = 256  # Closed episodes kept in memory awaiting display/flush
+
+# Audio Configuration
+AUDIO_STORE_DIR = "audio_store"  # Content-addressed clip store (sha256 -> WAV file)
+AUDIO_CLIP_CACHE_SIZE = 32  # Generated clips kept in memory (LRU)
+AUDIO_PREWARM_BEEPS = range(1, 11)  # Beep lengths (seconds) synthesised at startup
+AUDIO_PREWARM_PHRASES = ["Time to take your medicine! 💊", "Time for your meal! 🍽️"]  # Announcements synthesised at startup
+AUDIO_PLAYBACK_QUEUE_SIZE = 32  # Clips waiting for the speaker before new broadcasts are refused
+AUDIO_PLAYBACK_POLL = 0.05  # Seconds between end-of-clip checks on the playback thread
+AUDIO_CAPTURE_CHUNK = 1024  # Frames delivered per input callback
+AUDIO_CAPTURE_BUFFER_SECONDS = 60  # Microphone history kept in the capture ring buffer
+AUDIO_CODEC = "adpcm"  # Voice message encoding: "pcm16", "mulaw", "adpcm" or "flac" (needs soundfile)
+AUDIO_SPEECH_RATE = 16000  # Sample rate voice messages are stored at
+AUDIO_FADE_SECONDS = 0.01  # Fade applied at clip edges when mixing to avoid clicks
+AUDIO_MIX_PEAK = 0.9  # Normalised peak level of mixed announcements (fraction of full scale)
+
+# Text-to-Speech Configuration
+TTS_BACKEND = "auto"  # "espeak", "pyttsx3", "beep" or "auto" for the first one installed
+TTS_VOICE = None  # Engine voice name/variant, None for the engine default
+TTS_WORKERS = 2  # Synthesis threads kept off the UI thread
+TTS_CACHE_DIR = "tts_cache"  # Synthesised phrases kept across sessions and restarts
+
+# Announcement History Configuration
+ANNOUNCEMENT_MEMORY = 50  # Most recent announcements kept in memory per session (metadata only)
+ANNOUNCEMENT_LOG_DIR = "announcements"  # Append-only JSONL logs older announcements spill into
+ANNOUNCEMENT_PAGE_SIZE = 5  # Messages per page in Recent Messages
+
+# Authentication Configuration
+AUTH_KDF = "pbkdf2_sha256"  # Password hashing: "pbkdf2_sha256" or "scrypt"
+AUTH_PBKDF2_ITERATIONS = 600000  # PBKDF2-HMAC-SHA256 rounds (raise as hardware gets faster)
+AUTH_SCRYPT_N = 2 ** 15  # scrypt CPU/memory cost
+AUTH_SCRYPT_R = 8  # scrypt block size
+AUTH_SCRYPT_P = 1  # scrypt parallelism
+AUTH_WORKERS = 4  # Threads verifying passwords (hashlib releases the GIL)
+AUTH_CACHE_TTL = 300  # Seconds a successful login is remembered for the same password
+AUTH_CACHE_SIZE = 1024  # Users kept in the positive login cache
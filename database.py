@@ -1,58 +1,636 @@
+import atexit
+import logging
+import queue
+import threading
+import time
 import mysql.connector
-import streamlit as st
-from config import DB_CONFIG
+from collections import deque
+from contextlib import contextmanager
+from config import (DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_CONNECT_TIMEOUT, DB_WRITE_QUEUE_SIZE,
+                    DB_WRITE_QUEUE_BYTES, DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL, DB_WRITE_TIMEOUT,
+                    DB_WRITE_RETRIES, DB_WRITE_RETRY_BACKOFF, DB_WRITE_RETRY_BACKOFF_MAX, REMINDER_LOAD_PAGE_SIZE)
+from audio_store import get_audio_store
 
-def get_db_connection():
-    """Try to connect to MySQL database"""
+logger = logging.getLogger(__name__)
+
+# Server rejections that fail the same way on every retry
+PERMANENT_ERRORS = (mysql.connector.DataError, mysql.connector.IntegrityError, mysql.connector.ProgrammingError)
+
+class ConnectionPool:
+    """Process-wide pool of MySQL connections with ping-on-checkout"""
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, connect_timeout=DB_CONNECT_TIMEOUT,
+                 db_config=DB_CONFIG):
+        self.size = size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.db_config = db_config
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        
+        # Metrics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+    
+    def _connect(self):
+        """Open a new MySQL connection"""
+        return mysql.connector.connect(connection_timeout=self.connect_timeout, **self.db_config)
+    
+    def _take(self, timeout):
+        """Take an idle connection, open a new one if under size, or wait"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self.lock:
+            can_create = self.created < self.size
+            if can_create:
+                self.created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        
+        try:
+            return self.idle.get(timeout=timeout)
+        except queue.Empty:
+            with self.lock:
+                self.timeouts += 1
+            raise mysql.connector.errors.PoolError(f"No free database connection after {timeout}s")
+    
+    def acquire(self, timeout=None):
+        """Check out a healthy connection"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        conn = self._take(timeout)
+        
+        # Health check: ping and transparently reconnect stale connections
+        try:
+            conn.ping(reconnect=True, attempts=1, delay=0)
+        except Exception:
+            with self.lock:
+                self.reconnects += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            try:
+                conn = self._connect()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return conn
+    
+    def release(self, conn):
+        """Return a connection to the pool"""
+        try:
+            # Do not hand an open transaction to the next borrower
+            conn.rollback()
+        except Exception:
+            pass
+        with self.lock:
+            self.in_use -= 1
+        self.idle.put(conn)
+    
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def metrics(self):
+        """Pool utilization and wait-time metrics"""
+        with self.lock:
+            return {
+                "size": self.size,
+                "open": self.created,
+                "in_use": self.in_use,
+                "idle": self.idle.qsize(),
+                "utilization": round(self.in_use / self.size, 3) if self.size else 0.0,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "reconnects": self.reconnects,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+    
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self.lock:
+                self.created -= 1
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    """Return the process-wide connection pool and whether MySQL is reachable"""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = ConnectionPool()
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn, True
+        # Checking out one connection doubles as the availability probe
+        with _db_pool.connection():
+            pass
+        return _db_pool, True
     except mysql.connector.Error as e:
-        st.sidebar.warning(f"⚠️ MySQL not available: {e}")
+        logger.warning("MySQL not available: %s", e)
         return None, False
 
+class WriteBehindQueue:
+    """Queues writes and flushes them from a background thread in batched executemany transactions"""
+    def __init__(self, pool, max_items=DB_WRITE_QUEUE_SIZE, max_bytes=DB_WRITE_QUEUE_BYTES,
+                 batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_INTERVAL,
+                 timeout=DB_WRITE_TIMEOUT, retries=DB_WRITE_RETRIES, backoff=DB_WRITE_RETRY_BACKOFF,
+                 backoff_max=DB_WRITE_RETRY_BACKOFF_MAX):
+        self.pool = pool
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        
+        self.items = deque()
+        self.pending_bytes = 0
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.running = True
+        
+        # Metrics
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_error = None
+        
+        self.flush_listeners = {}
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def submit(self, sql, params, timeout=None):
+        """Queue one write; blocks while the queue is full and returns False if it stays full"""
+        size = sum(len(p) for p in params if isinstance(p, (bytes, bytearray)))
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        
+        with self.condition:
+            # Back-pressure on both row count and BLOB bytes (a single oversized row is still accepted)
+            while self.running and (len(self.items) >= self.max_items or
+                                    (self.items and self.pending_bytes + size > self.max_bytes)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    return False
+                self.condition.wait(remaining)
+            
+            if not self.running:
+                self.rejected += 1
+                return False
+            
+            self.items.append((sql, params, size))
+            self.pending_bytes += size
+            if len(self.items) >= self.batch_size:
+                self.condition.notify_all()
+        return True
+    
+    def _take_batch(self):
+        """Wait for work and take up to batch_size queued writes"""
+        with self.condition:
+            if self.running and len(self.items) < self.batch_size:
+                self.condition.wait(self.flush_interval)
+            batch = []
+            while self.items and len(batch) < self.batch_size:
+                batch.append(self.items.popleft())
+            self.in_flight = len(batch)
+            return batch
+    
+    def _write(self, batch):
+        """Write one batch in a single transaction, grouping consecutive identical statements"""
+        groups = []
+        for sql, params, _ in batch:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+        
+        with self.pool.connection() as db_conn:
+            cursor = db_conn.cursor()
+            for sql, rows in groups:
+                cursor.executemany(sql, rows)
+            db_conn.commit()
+    
+    def add_flush_listener(self, name, callback):
+        """Register (or replace) a callback invoked with (statements, ok) after each batch"""
+        with self.condition:
+            self.flush_listeners[name] = callback
+    
+    def _notify_flushed(self, batch, ok):
+        """Tell listeners which statements were just committed (or lost)"""
+        with self.condition:
+            listeners = list(self.flush_listeners.values())
+        statements = {sql for sql, _, _ in batch}
+        for callback in listeners:
+            try:
+                callback(statements, ok)
+            except Exception as e:
+                logger.exception("Write-behind listener failed: %s", e)
+    
+    def _backoff_wait(self, attempt):
+        """Sleep before retrying a failed batch; cut short when the queue is closed (caller holds the lock)"""
+        deadline = time.monotonic() + min(self.backoff * 2 ** (attempt - 1), self.backoff_max)
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.condition.wait(remaining)
+    
+    def _replay(self, batch):
+        """Write a rejected batch one row at a time so only the offending rows are lost
+        
+        Returns the rows still to retry (a suffix of batch) and the transient
+        error that stopped the replay, if any.
+        """
+        for i, item in enumerate(batch):
+            try:
+                self._write([item])
+            except PERMANENT_ERRORS as e:
+                self.failed += 1
+                self.last_error = str(e)
+                logger.error("Write-behind dropped a rejected write: %s", e)
+                self._notify_flushed([item], False)
+            except Exception as e:
+                return batch[i:], e
+            else:
+                self.written += 1
+                self._notify_flushed([item], True)
+        return [], None
+    
+    def _run(self):
+        """Writer loop; exits only once stopped and fully drained
+        
+        A batch the server rejects (bad data, constraint or SQL error) is
+        replayed row by row and only the offending rows are dropped. Any other
+        failure puts the unwritten rows back at the head of the queue to retry
+        with exponential backoff; they are dropped (and reported) only after
+        retries runs out.
+        """
+        attempt = 0
+        while True:
+            batch = self._take_batch()
+            retry = []
+            if batch:
+                try:
+                    self._write(batch)
+                except PERMANENT_ERRORS as e:
+                    logger.warning("Write-behind batch rejected, replaying row by row: %s", e)
+                    retry, error = self._replay(batch)
+                except Exception as e:
+                    retry, error = batch, e
+                else:
+                    self.written += len(batch)
+                    self._notify_flushed(batch, True)
+                
+                if not retry:
+                    attempt = 0
+                else:
+                    attempt += 1
+                    if attempt <= self.retries:
+                        self.retried += len(retry)
+                        logger.warning("Write-behind flush failed (attempt %d of %d): %s",
+                                       attempt, self.retries + 1, error)
+                    else:
+                        attempt = 0
+                        self.failed += len(retry)
+                        self.last_error = str(error)
+                        logger.error("Write-behind flush failed, dropping %d writes: %s", len(retry), error)
+                        self._notify_flushed(retry, False)
+                        retry = []
+            
+            with self.condition:
+                self.in_flight = 0
+                self.pending_bytes -= sum(size for _, _, size in batch[:len(batch) - len(retry)])
+                if retry:
+                    self.items.extendleft(reversed(retry))
+                    self._backoff_wait(attempt)
+                self.condition.notify_all()
+                if not self.running and not self.items:
+                    return
+    
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            self.condition.notify_all()
+            while self.items or self.in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+    
+    def close(self, timeout=10):
+        """Stop accepting writes and flush what is queued"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout)
+    
+    def metrics(self):
+        """Queue depth and throughput counters"""
+        with self.condition:
+            return {
+                "queued": len(self.items),
+                "queued_bytes": self.pending_bytes,
+                "written": self.written,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "retried": self.retried,
+                "last_error": self.last_error,
+            }
+    
+    def log_activity(self, username, activity):
+        """Queue an activity_log row"""
+        return self.submit("INSERT INTO activity_log (username, activity) VALUES (%s, %s)", (username, activity))
+    
+    def save_reminder(self, username, reminder, audio_hash, status="pending"):
+        """Queue a reminders row keyed by the reminder's row_key (audio is referenced by its audio store hash)"""
+        return self.submit(
+            "INSERT INTO reminders (row_key, username, title, message, trigger_time, repeat_type, audio_hash, status) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (reminder["row_key"], username, reminder["title"], reminder["message"], reminder["trigger_time"],
+             reminder["repeat"], audio_hash, status)
+        )
+    
+    def save_motion_event(self, username, episode, timeout=None):
+        """Queue a closed motion episode"""
+        camera_id, *rest = episode.to_row()
+        return self.submit(
+            "INSERT INTO motion_events (camera_id, username, start_time, end_time, peak_area, box_x, box_y, box_w, box_h, frames) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (camera_id, username, *rest), timeout=timeout
+        )
+    
+    def _reminder_where(self, username, reminder):
+        """WHERE clause for a reminder's row: by id when loaded from the database, else by its row_key"""
+        if reminder.get("db_id"):
+            return "id=%s", (reminder["db_id"],)
+        return "row_key=%s AND username=%s", (reminder["row_key"], username)
+    
+    def update_reminder_status(self, username, reminder, status):
+        """Queue a reminder status change"""
+        where, params = self._reminder_where(username, reminder)
+        return self.submit(f"UPDATE reminders SET status=%s WHERE {where}", (status, *params))
+    
+    def record_fired_reminder(self, reminder):
+        """Persist a fired reminder: repeating ones move to their next occurrence"""
+        if reminder.get("next_trigger_time"):
+            return self.reschedule_reminder(reminder["username"], reminder, reminder["next_trigger_time"])
+        return self.update_reminder_status(reminder["username"], reminder, "triggered")
+    
+    def reschedule_reminder(self, username, reminder, trigger_time):
+        """Queue moving a repeating reminder's row to its next occurrence"""
+        where, params = self._reminder_where(username, reminder)
+        return self.submit(f"UPDATE reminders SET trigger_time=%s WHERE {where}", (trigger_time, *params))
+
+_write_queue = None
+
+def get_write_queue(pool):
+    """Return the process-wide write-behind queue, flushed on interpreter shutdown"""
+    global _write_queue
+    with _db_pool_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue(pool)
+            atexit.register(_write_queue.close)
+        return _write_queue
+
+def close_database():
+    """Flush the write-behind queue, then close the pool"""
+    if _write_queue is not None:
+        _write_queue.close()
+    if _db_pool is not None:
+        _db_pool.close()
+
+# Versioned schema migrations: (version, description, statements), applied in order
+MIGRATIONS = [
+    (1, "Base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activity_log (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50),
+            activity VARCHAR(255),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50),
+            title VARCHAR(100),
+            message TEXT,
+            trigger_time DATETIME,
+            repeat_type VARCHAR(20),
+            audio_data LONGBLOB,
+            status VARCHAR(20),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "Reminder audio referenced by audio store hash", [
+        "ALTER TABLE reminders ADD COLUMN audio_hash CHAR(64)",
+    ]),
+    (3, "Debounced motion episodes", [
+        """
+        CREATE TABLE IF NOT EXISTS motion_events (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            camera_id VARCHAR(64),
+            username VARCHAR(50),
+            start_time DATETIME(3),
+            end_time DATETIME(3),
+            peak_area INT,
+            box_x INT,
+            box_y INT,
+            box_w INT,
+            box_h INT,
+            frames INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (4, "Indexes for per-user reminder and activity queries", [
+        "CREATE INDEX idx_reminders_user_status_time ON reminders (username, status, trigger_time)",
+        "CREATE INDEX idx_activity_log_user_time ON activity_log (username, timestamp)",
+        "CREATE INDEX idx_motion_events_user_start ON motion_events (username, start_time)",
+    ]),
+    (5, "Room for RRULE-style repeat rules", [
+        "ALTER TABLE reminders MODIFY repeat_type VARCHAR(255)",
+    ]),
+    (6, "Covering index for login hash lookups", [
+        "CREATE INDEX idx_users_username_hash ON users (username, password_hash)",
+    ]),
+    (7, "Client-generated row keys for reminders created in a session", [
+        "ALTER TABLE reminders ADD COLUMN row_key CHAR(32)",
+        "CREATE UNIQUE INDEX idx_reminders_row_key ON reminders (row_key)",
+    ]),
+]
+
+# Errors that mean a statement was already applied before migrations were tracked
+_ALREADY_APPLIED = {
+    1060,  # Duplicate column name
+    1061,  # Duplicate key name
+}
+
+def migrate(db_conn, target=None):
+    """Apply pending migrations up to target (default: latest); returns versions applied"""
+    cursor = db_conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    done = {row[0] for row in cursor.fetchall()}
+    
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        for statement in statements:
+            try:
+                cursor.execute(statement)
+            except mysql.connector.Error as e:
+                if e.errno not in _ALREADY_APPLIED:
+                    raise
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        db_conn.commit()
+        applied.append(version)
+    return applied
+
 def create_tables(db_conn):
     """Create database tables automatically"""
     try:
-        cursor = db_conn.cursor()
-        
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create activity_log table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50),
-                activity VARCHAR(255),
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create reminders table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50),
-                title VARCHAR(100),
-                message TEXT,
-                trigger_time DATETIME,
-                repeat_type VARCHAR(20),
-                audio_data LONGBLOB,
-                status VARCHAR(20),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        db_conn.commit()
+        applied = migrate(db_conn)
+        if applied:
+            return True, f"✅ Tables created successfully! (migrations {', '.join(map(str, applied))})"
         return True, "✅ Tables created successfully!"
         
     except Exception as e:
         return False, f"❌ Error creating tables: {e}"
+
+def get_pending_reminders(db_conn, username, limit=100, after=None):
+    """Pending reminders for a user, soonest first (idx_reminders_user_status_time)"""
+    cursor = db_conn.cursor(dictionary=True)
+    if after is None:
+        cursor.execute(
+            "SELECT id, title, message, trigger_time, repeat_type, audio_hash, status FROM reminders "
+            "WHERE username=%s AND status='pending' ORDER BY trigger_time LIMIT %s",
+            (username, limit)
+        )
+    else:
+        cursor.execute(
+            "SELECT id, title, message, trigger_time, repeat_type, audio_hash, status FROM reminders "
+            "WHERE username=%s AND status='pending' AND trigger_time > %s ORDER BY trigger_time LIMIT %s",
+            (username, after, limit)
+        )
+    return cursor.fetchall()
+
+def iter_pending_reminders(db_conn, username, page_size=REMINDER_LOAD_PAGE_SIZE):
+    """Stream a user's pending reminders in keyset-paginated pages, without audio blobs"""
+    cursor = db_conn.cursor(dictionary=True)
+    last_time, last_id = None, 0
+    while True:
+        if last_time is None:
+            cursor.execute(
+                "SELECT id, title, message, trigger_time, repeat_type, audio_hash, audio_data IS NOT NULL AS has_audio_data "
+                "FROM reminders WHERE username=%s AND status='pending' ORDER BY trigger_time, id LIMIT %s",
+                (username, page_size)
+            )
+        else:
+            cursor.execute(
+                "SELECT id, title, message, trigger_time, repeat_type, audio_hash, audio_data IS NOT NULL AS has_audio_data "
+                "FROM reminders WHERE username=%s AND status='pending' "
+                "AND (trigger_time > %s OR (trigger_time = %s AND id > %s)) ORDER BY trigger_time, id LIMIT %s",
+                (username, last_time, last_time, last_id, page_size)
+            )
+        rows = cursor.fetchall()
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_time, last_id = rows[-1]["trigger_time"], rows[-1]["id"]
+
+class BlobAudio:
+    """Lazy handle to a legacy reminders.audio_data blob, fetched only at playback"""
+    __slots__ = ("pool", "reminder_id")
+    
+    def __init__(self, pool, reminder_id):
+        self.pool = pool
+        self.reminder_id = reminder_id
+    
+    def getvalue(self):
+        """Fetch the clip (BytesIO-compatible)"""
+        with self.pool.connection() as db_conn:
+            cursor = db_conn.cursor()
+            cursor.execute("SELECT audio_data FROM reminders WHERE id=%s", (self.reminder_id,))
+            row = cursor.fetchone()
+        return row[0] if row and row[0] else b""
+
+def lazy_reminder_audio(pool, row):
+    """Lazy audio handle for a reminders row: audio store ref, legacy blob or None"""
+    if row.get("audio_hash"):
+        return get_audio_store().ref(row["audio_hash"])
+    if row.get("has_audio_data"):
+        return BlobAudio(pool, row["id"])
+    return None
+
+def get_activity(db_conn, username, start, end, limit=500):
+    """A user's activity in [start, end), newest first (idx_activity_log_user_time)"""
+    cursor = db_conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT id, activity, timestamp FROM activity_log "
+        "WHERE username=%s AND timestamp >= %s AND timestamp < %s ORDER BY timestamp DESC LIMIT %s",
+        (username, start, end, limit)
+    )
+    return cursor.fetchall()
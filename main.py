@@ -6,13 +6,37 @@ from streamlit_webrtc import webrtc_streamer, WebRtcMode, RTCConfiguration
 import atexit
 
 # Import custom modules
-from config import NGROK_AUTH_TOKEN, NGROK_ADDR, TIMEZONE
-from database import get_db_connection, create_tables
+from config import NGROK_AUTH_TOKEN, NGROK_ADDR, TIMEZONE, DB_STATUS_TTL
+from auth import get_authenticator
+from database import (get_db_pool, get_write_queue, close_database, create_tables, iter_pending_reminders,
+                      lazy_reminder_audio)
+from render_cache import SectionTimer, get_render_cache
 from audio_system import AudioSystem
-from reminder_system import ReminderSystem
+from capture import get_audio_capture
+from tts import get_tts
+from playback import PRIORITY_REMINDER, get_playback_service, play_reminder
+from audio_store import get_audio_store
+from announcements import AnnouncementLog
+from reminder_system import get_reminder_system
 from video_processor import VideoProcessor
+from multi_camera import stop_shared_engine
+from recurrence import WEEKDAYS, RULE_TIME_FORMAT
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+@st.cache_resource
+def rtc_configuration():
+    """Static WebRTC configuration, built once per process"""
+    return RTCConfiguration(
+        {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
+    )
+
+timer = SectionTimer()
+render_cache = get_render_cache()
 
 # ------------------ NGROK (FIXED) ------------------
+# One tunnel per process; new sessions reuse it instead of restarting ngrok
+@st.cache_resource
 def start_ngrok():
     try:
         ngrok.set_auth_token(NGROK_AUTH_TOKEN)
@@ -22,14 +46,34 @@ def start_ngrok():
     except Exception as e:
         return f"NGROK ERROR: {e}"
 
-if "public_url" not in st.session_state:
-    st.session_state.public_url = start_ngrok()
-
 st.sidebar.success("🌐 Public Link")
-st.sidebar.write(st.session_state.public_url)
+st.sidebar.write(start_ngrok())
+timer.lap("setup")
 
 # ------------------ DATABASE CONNECTION ------------------
-db_conn, db_available = get_db_connection()
+# The reachability probe checks out a connection, so reruns reuse its result until
+# the TTL lapses or a failed write batch invalidates it
+db_pool, db_available = render_cache.get("db", "status", get_db_pool, ttl=DB_STATUS_TTL)
+write_queue = get_write_queue(db_pool) if db_available else None
+if not db_available:
+    st.sidebar.warning("⚠️ MySQL not available")
+
+def on_db_flush(statements, ok):
+    """A failed batch usually means MySQL went away; re-probe on the next rerun"""
+    if not ok:
+        render_cache.invalidate("db")
+
+if write_queue:
+    write_queue.add_flush_listener("render-cache", on_db_flush)
+    
+    # Writes dropped after every retry failed are reported once per session
+    failed_seen = st.session_state.setdefault("db_failed_seen", write_queue.failed)
+    if write_queue.failed > failed_seen:
+        st.sidebar.warning(
+            f"⚠️ {write_queue.failed - failed_seen} database writes could not be saved: {write_queue.last_error}"
+        )
+        st.session_state.db_failed_seen = write_queue.failed
+timer.lap("database")
 
 # ------------------ SESSION STATE ------------------
 if "logged_in" not in st.session_state:
@@ -39,18 +83,43 @@ if "logged_in" not in st.session_state:
     st.session_state.audio_system = None
     st.session_state.reminder_system = None
     st.session_state.motion_alerts = []
-    st.session_state.announcements = []
+    st.session_state.announcements = None
     st.session_state.reminders = []
-    st.session_state.triggered_reminders = []
+    st.session_state.reminder_subscription = None
     st.session_state.start_time = None
 
 # Initialize systems
 if st.session_state.get("audio_system") is None:
     st.session_state.audio_system = AudioSystem()
 
+# One scheduler thread per process, shared by every session
 if st.session_state.get("reminder_system") is None:
-    st.session_state.reminder_system = ReminderSystem()
-    st.session_state.reminder_system.start_background_check()
+    st.session_state.reminder_system = get_reminder_system()
+
+st.session_state.reminder_system.events.add_listener("speaker", play_reminder)
+if write_queue:
+    st.session_state.reminder_system.events.add_listener("persistence", write_queue.record_fired_reminder)
+st.session_state.reminder_system.add_change_listener(
+    "render-cache", lambda username: render_cache.invalidate(("reminders", username))
+)
+
+def reminder_view(name, compute):
+    """Per-user reminder lookup memoised until the scheduler reports a change for that user"""
+    return render_cache.get(("reminders", st.session_state.current_user), name, compute)
+
+def announce_when_ready(text, type="quick"):
+    """Synthesise on the TTS pool, then log and play the announcement without blocking the rerun"""
+    announcements = st.session_state.announcements
+    audio_system = st.session_state.audio_system
+    timestamp = datetime.now()
+    
+    def ready(speech):
+        audio = speech.result()
+        announcements.add("SYSTEM", text, type, audio, timestamp=timestamp)
+        audio_system.play_audio(audio, label=text)
+    
+    audio_system.speech_future(text).add_done_callback(ready)
+timer.lap("session")
 
 # ------------------ TITLE ------------------
 st.markdown(
@@ -74,24 +143,27 @@ if not st.session_state.logged_in:
             if username and password:
                 if db_available:
                     try:
-                        cursor = db_conn.cursor()
-                        cursor.execute(
-                            "SELECT * FROM users WHERE username=%s AND password_hash=%s",
-                            (username, password)
-                        )
-                        user = cursor.fetchone()
+                        user = get_authenticator(db_pool).authenticate(username, password)
+                        
+                        # Create reminders table if it doesn't exist, then reload saved reminders
+                        if user:
+                            with db_pool.connection() as db_conn:
+                                create_tables(db_conn)
+                                st.session_state.reminder_system.load_reminders(
+                                    username, iter_pending_reminders(db_conn, username),
+                                    lambda row: lazy_reminder_audio(db_pool, row)
+                                )
                         
                         if user:
+                            write_queue.log_activity(username, "login")
                             st.session_state.logged_in = True
                             st.session_state.current_user = username
-                            st.session_state.video_processor = VideoProcessor()
+                            st.session_state.video_processor = None
                             st.session_state.motion_alerts = []
-                            st.session_state.announcements = []
+                            st.session_state.announcements = AnnouncementLog(username)
                             st.session_state.reminders = []
                             st.session_state.start_time = datetime.now()
-                            
-                            # Create reminders table if it doesn't exist
-                            create_tables(db_conn)
+                            st.session_state.reminder_subscription = st.session_state.reminder_system.events.subscribe(username)
                             
                             st.success(f"✅ Welcome {username}!")
                             st.rerun()
@@ -102,11 +174,12 @@ if not st.session_state.logged_in:
                 else:
                     st.session_state.logged_in = True
                     st.session_state.current_user = username
-                    st.session_state.video_processor = VideoProcessor()
+                    st.session_state.video_processor = None
                     st.session_state.motion_alerts = []
-                    st.session_state.announcements = []
+                    st.session_state.announcements = AnnouncementLog(username)
                     st.session_state.reminders = []
                     st.session_state.start_time = datetime.now()
+                    st.session_state.reminder_subscription = st.session_state.reminder_system.events.subscribe(username)
                     st.success(f"✅ Welcome {username}!")
                     st.rerun()
             else:
@@ -118,12 +191,7 @@ if not st.session_state.logged_in:
             if username and password:
                 if db_available:
                     try:
-                        cursor = db_conn.cursor()
-                        cursor.execute(
-                            "INSERT INTO users (username, password_hash) VALUES (%s, %s)",
-                            (username, password)
-                        )
-                        db_conn.commit()
+                        get_authenticator(db_pool).register(username, password)
                         st.success("✅ Account created! You can now login.")
                     except mysql.connector.Error as e:
                         if e.errno == 1062:
@@ -144,21 +212,26 @@ if not st.session_state.logged_in:
 
 # ------------------ MAIN SYSTEM ------------------
 else:
-    # Check for triggered reminders
-    if hasattr(st.session_state, 'triggered_reminders') and st.session_state.triggered_reminders:
-        for reminder in st.session_state.triggered_reminders[:]:
-            if reminder.get("audio_message"):
-                st.session_state.audio_system.play_audio(reminder["audio_message"])
+    # Check for triggered reminders published to this session (the speaker listener plays them)
+    subscription = st.session_state.get("reminder_subscription")
+    if subscription:
+        for reminder in subscription.drain():
+            missed = f"\n({reminder['missed']} missed while offline)" if reminder.get("missed") else ""
+            st.toast(f"🔔 REMINDER: {reminder['title']}\n{reminder['message']}{missed}", icon="⏰")
             
-            st.toast(f"🔔 REMINDER: {reminder['title']}\n{reminder['message']}", icon="⏰")
-            
-            st.session_state.announcements.append({
-                "user": "REMINDER SYSTEM",
-                "text": f"Reminder: {reminder['title']} - {reminder['message']}",
-                "time": datetime.now().strftime("%H:%M:%S"),
-                "type": "reminder"
-            })
-        st.session_state.triggered_reminders = []
+            st.session_state.announcements.add(
+                "REMINDER SYSTEM", f"Reminder: {reminder['title']} - {reminder['message']}", "reminder"
+            )
+    
+    # Hand closed motion episodes to the write-behind queue
+    processor = st.session_state.video_processor
+    if processor and write_queue:
+        episodes = processor.events.drain()
+        rejected = [e for e in episodes if not write_queue.save_motion_event(st.session_state.current_user, e, timeout=0)]
+        if rejected:
+            processor.events.requeue(rejected)
+    
+    timer.lap("reminder inbox")
     
     # Sidebar Navigation
     st.sidebar.markdown(f"**👤 User: {st.session_state.current_user}**")
@@ -173,16 +246,26 @@ else:
         st.sidebar.metric("Motion Events", st.session_state.video_processor.motion_count)
     
     if st.session_state.reminder_system:
-        pending_reminders = len(st.session_state.reminder_system.get_pending_reminders())
+        pending_reminders = reminder_view(
+            "pending_count", lambda: st.session_state.reminder_system.pending_count(st.session_state.current_user)
+        )
         st.sidebar.metric("Active Reminders", pending_reminders)
     else:
         st.sidebar.metric("Active Reminders", 0)
     
     st.sidebar.markdown("---")
     if st.sidebar.button("🚪 Logout", use_container_width=True):
+        if write_queue:
+            write_queue.log_activity(st.session_state.current_user, "logout")
+        if st.session_state.get("reminder_subscription"):
+            st.session_state.reminder_system.events.unsubscribe(st.session_state.reminder_subscription)
+            st.session_state.reminder_subscription = None
+        if st.session_state.announcements is not None:
+            st.session_state.announcements.flush()
         st.session_state.logged_in = False
         st.session_state.current_user = ""
         st.rerun()
+    timer.lap("sidebar")
     
     # ------------------ CCTV PAGE ------------------
     if page == "🎥 CCTV":
@@ -203,14 +286,10 @@ else:
         st.markdown("---")
         st.subheader("🎥 Live Camera Feed")
         
-        RTC_CONFIGURATION = RTCConfiguration(
-            {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
-        )
-        
         webrtc_ctx = webrtc_streamer(
             key="cctv-monitoring",
             mode=WebRtcMode.SENDRECV,
-            rtc_configuration=RTC_CONFIGURATION,
+            rtc_configuration=rtc_configuration(),
             media_stream_constraints={
                 "video": {"width": {"ideal": 1280}, "height": {"ideal": 720}, "frameRate": {"ideal": 30}},
                 "audio": False
@@ -219,9 +298,16 @@ else:
             async_processing=True,
         )
         
+        # Track the live stream's processor so the sidebar and Dashboard see its episodes
+        if webrtc_ctx.video_processor:
+            st.session_state.video_processor = webrtc_ctx.video_processor
+        
         if not webrtc_ctx.state.playing:
             st.warning("⚠️ Camera feed not active")
             st.image("https://via.placeholder.com/640x360/333333/FFFFFF?text=Live+Camera+Feed")
+        elif webrtc_ctx.video_processor:
+            with st.expander("⚙️ Pipeline Stats"):
+                st.json(webrtc_ctx.video_processor.stats.snapshot())
     
     # ------------------ TALK PAGE ------------------
     elif page == "📢 Talk":
@@ -237,16 +323,11 @@ else:
                 with st.spinner(f"Recording for {record_duration} seconds..."):
                     audio_data = st.session_state.audio_system.record_audio(record_duration)
                     if audio_data:
-                        timestamp = datetime.now().strftime("%H:%M:%S")
-                        st.session_state.announcements.append({
-                            "user": st.session_state.current_user,
-                            "text": message_text,
-                            "time": timestamp,
-                            "audio": audio_data,
-                            "type": "broadcast"
-                        })
+                        st.session_state.announcements.add(st.session_state.current_user, message_text, "broadcast", audio_data)
                         st.success(f"✅ Message recorded! ({record_duration}s)")
-                        st.session_state.audio_system.play_audio(audio_data)
+                        st.session_state.audio_system.play_audio(
+                            st.session_state.audio_system.compose_announcement(audio_data), label="broadcast"
+                        )
                     else:
                         st.error("❌ Failed to record audio")
         
@@ -255,29 +336,20 @@ else:
             quick_msgs = st.columns(2)
             with quick_msgs[0]:
                 if st.button("💊 Medicine Time", use_container_width=True):
-                    msg = "Time to take your medicine! 💊"
-                    audio = st.session_state.audio_system.text_to_speech(msg)
-                    st.session_state.announcements.append({
-                        "user": "SYSTEM", "text": msg, "time": datetime.now().strftime("%H:%M:%S"),
-                        "audio": audio, "type": "quick"
-                    })
-                    st.session_state.audio_system.play_audio(audio)
+                    announce_when_ready("Time to take your medicine! 💊")
                     st.success("Medicine reminder announced!")
             
             with quick_msgs[1]:
                 if st.button("🍽️ Meal Time", use_container_width=True):
-                    msg = "Time for your meal! 🍽️"
-                    audio = st.session_state.audio_system.text_to_speech(msg)
-                    st.session_state.announcements.append({
-                        "user": "SYSTEM", "text": msg, "time": datetime.now().strftime("%H:%M:%S"),
-                        "audio": audio, "type": "quick"
-                    })
-                    st.session_state.audio_system.play_audio(audio)
+                    announce_when_ready("Time for your meal! 🍽️")
                     st.success("Meal reminder announced!")
             
             st.subheader("📋 Recent Messages")
-            if st.session_state.announcements:
-                for ann in reversed(st.session_state.announcements[-5:]):
+            announcements = st.session_state.announcements
+            if announcements is not None and len(announcements):
+                page_count = announcements.page_count()
+                message_page = st.number_input("Page", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+                for ann in announcements.page(message_page - 1):
                     st.write(f"**{ann['user']}** ({ann['time']}): {ann['text'][:50]}...")
             else:
                 st.write("No messages yet")
@@ -294,7 +366,7 @@ else:
             
             col1, col2 = st.columns(2)
             with col1:
-                schedule_type = st.radio("Schedule Type", ["In X minutes", "Specific Time", "Daily", "Hourly"])
+                schedule_type = st.radio("Schedule Type", ["In X minutes", "Specific Time", "Daily", "Hourly", "Weekly"])
                 if schedule_type == "In X minutes":
                     minutes = st.number_input("Minutes from now", min_value=1, max_value=1440, value=5)
                     trigger_time = datetime.now() + timedelta(minutes=minutes)
@@ -310,14 +382,16 @@ else:
                     minute = st.number_input("Minute past each hour", min_value=0, max_value=59, value=0)
                     trigger_time = datetime.now().replace(minute=minute, second=0, microsecond=0)
                     if trigger_time < datetime.now(): trigger_time += timedelta(hours=1)
+                elif schedule_type == "Weekly":
+                    weekdays = st.multiselect("On days", WEEKDAY_NAMES, default=[WEEKDAY_NAMES[datetime.now().weekday()]])
+                    time_input = st.time_input("Weekly at", datetime.now().time())
+                    trigger_time = datetime.combine(datetime.now().date(), time_input)
             
             with col2:
                 st.subheader("🔊 Audio Settings")
                 audio_option = st.radio("Audio Announcement", ["Text-to-Speech", "Record Voice", "Beep Sound", "No Audio"])
                 audio_data = None
-                if audio_option == "Text-to-Speech":
-                    audio_data = st.session_state.audio_system.text_to_speech(reminder_message)
-                elif audio_option == "Record Voice":
+                if audio_option == "Record Voice":
                     record_seconds = st.slider("Record for (seconds)", 3, 30, 10)
                     if st.button("🎤 Record Now"):
                         with st.spinner("Recording..."):
@@ -330,31 +404,60 @@ else:
             
             repeat_option = "once"
             if schedule_type in ["Daily", "Hourly"]: repeat_option = schedule_type.lower()
-            else: repeat_option = st.selectbox("Repeat", ["once", "daily", "hourly"])
+            elif schedule_type == "Weekly":
+                byday = ",".join(WEEKDAYS[WEEKDAY_NAMES.index(day)] for day in weekdays) or WEEKDAYS[datetime.now().weekday()]
+                repeat_option = f"FREQ=WEEKLY;BYDAY={byday}"
+            else:
+                repeat_option = st.selectbox("Repeat", ["once", "daily", "hourly", "weekly", "every N hours"])
+                if repeat_option == "every N hours":
+                    every_hours = st.number_input("Every how many hours", min_value=2, max_value=72, value=4)
+                    repeat_option = f"FREQ=HOURLY;INTERVAL={every_hours}"
+            
+            if repeat_option != "once":
+                ends = st.radio("Ends", ["Never", "On date", "After N times"], horizontal=True)
+                if ends == "On date":
+                    until = datetime.combine(st.date_input("Last day", datetime.now() + timedelta(days=30)), datetime.max.time())
+                    repeat_option = f"{'FREQ=' + repeat_option.upper() if '=' not in repeat_option else repeat_option};UNTIL={until.strftime(RULE_TIME_FORMAT)}"
+                elif ends == "After N times":
+                    occurrences = st.number_input("Occurrences", min_value=1, max_value=1000, value=10)
+                    repeat_option = f"{'FREQ=' + repeat_option.upper() if '=' not in repeat_option else repeat_option};COUNT={occurrences}"
             
             if st.button("✅ SET REMINDER", use_container_width=True, type="primary"):
-                reminder = st.session_state.reminder_system.add_reminder(
-                    title=reminder_title, message=reminder_message, trigger_time=trigger_time,
-                    repeat=repeat_option, audio_message=audio_data
-                )
-                st.session_state.reminders.append(reminder)
-                
-                if db_available:
-                    try:
-                        cursor = db_conn.cursor()
-                        cursor.execute(
-                            "INSERT INTO reminders (username, title, message, trigger_time, repeat_type, audio_data, status) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                            (st.session_state.current_user, reminder_title, reminder_message, trigger_time, repeat_option, audio_data.getvalue() if audio_data else None, "pending")
-                        )
-                        db_conn.commit()
-                    except Exception as e:
-                        st.warning(f"⚠️ Could not save to database: {e}")
+                # Identical clips (e.g. the default beep) are stored once and referenced by hash
+                audio_store = get_audio_store()
+                if audio_option == "Text-to-Speech":
+                    # Synthesised only on submit, so drafts typed into the message never reach the TTS cache
+                    with st.spinner("Synthesising speech..."):
+                        audio_data = st.session_state.audio_system.speech_clip(reminder_message)
+                audio_hash = audio_store.put(audio_data) if audio_data else None
+                try:
+                    reminder = st.session_state.reminder_system.add_reminder(
+                        title=reminder_title, message=reminder_message, trigger_time=trigger_time,
+                        repeat=repeat_option, audio_message=audio_store.ref(audio_hash),
+                        username=st.session_state.current_user
+                    )
+                except ValueError as e:
+                    reminder = None
+                    st.error(f"❌ {e}")
                 
-                st.success(f"✅ Reminder set for {trigger_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                if reminder is not None:
+                    st.session_state.reminders.append(reminder)
+                    
+                    if write_queue:
+                        queued = write_queue.save_reminder(st.session_state.current_user, reminder, audio_hash)
+                        if queued:
+                            write_queue.log_activity(st.session_state.current_user, f"set reminder: {reminder_title}")
+                        else:
+                            st.warning("⚠️ Could not save to database: write queue is full")
+                    
+                    # The stored time: BYDAY rules and past starts may have moved it on
+                    st.success(f"✅ Reminder set for {reminder.trigger_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
         with tab2:
             st.subheader("📋 Active Reminders")
-            pending_reminders = st.session_state.reminder_system.get_pending_reminders()
+            pending_reminders = reminder_view(
+                "pending", lambda: st.session_state.reminder_system.get_pending_reminders(st.session_state.current_user)
+            )
             if pending_reminders:
                 for reminder in pending_reminders:
                     col1, col2, col3 = st.columns([3, 1, 1])
@@ -363,10 +466,12 @@ else:
                         st.write(reminder['message'])
                     with col2:
                         if st.button("▶️ Test", key=f"test_{reminder['id']}"):
-                            if reminder.get("audio_message"): st.session_state.audio_system.play_audio(reminder["audio_message"])
+                            if reminder.get("audio_message"): st.session_state.audio_system.play_audio(reminder["audio_message"], PRIORITY_REMINDER, reminder["title"])
                     with col3:
                         if st.button("❌ Cancel", key=f"cancel_{reminder['id']}"):
-                            if st.session_state.reminder_system.cancel_reminder(reminder['id']):
+                            if st.session_state.reminder_system.cancel_reminder(reminder['id'], st.session_state.current_user):
+                                if write_queue:
+                                    write_queue.update_reminder_status(st.session_state.current_user, reminder, "cancelled")
                                 st.success("Reminder cancelled!")
                                 st.rerun()
                     st.markdown("---")
@@ -379,12 +484,17 @@ else:
             with presets[0]:
                 if st.button("💊 Medicine\n(5 minutes)", use_container_width=True):
                     trigger_time = datetime.now() + timedelta(minutes=5)
-                    audio = st.session_state.audio_system.text_to_speech("Time to take your medicine! 💊")
                     reminder = st.session_state.reminder_system.add_reminder(
                         title="Medicine Time", message="Take your prescribed medicine",
-                        trigger_time=trigger_time, audio_message=audio
+                        trigger_time=trigger_time, username=st.session_state.current_user
                     )
                     st.session_state.reminders.append(reminder)
+                    
+                    # The clip is attached when the TTS pool finishes, well before the reminder fires
+                    def attach_audio(speech, reminder=reminder):
+                        audio_store = get_audio_store()
+                        reminder.audio_message = audio_store.ref(audio_store.put(speech.result()))
+                    st.session_state.audio_system.speech_future("Time to take your medicine! 💊").add_done_callback(attach_audio)
                     st.success(f"✅ Medicine reminder set for 5 minutes!")
     
     # ------------------ DASHBOARD PAGE ------------------
@@ -394,42 +504,84 @@ else:
         
         # Stats with safety checks
         with col1:
-            active_val = len(st.session_state.reminder_system.get_pending_reminders()) if st.session_state.reminder_system else 0
+            active_val = reminder_view(
+                "pending_count", lambda: st.session_state.reminder_system.pending_count(st.session_state.current_user)
+            ) if st.session_state.reminder_system else 0
             st.metric("Active Reminders", active_val)
         with col2:
             motion_val = st.session_state.video_processor.motion_count if st.session_state.video_processor else 0
             st.metric("Motion Events", motion_val)
         with col3:
-            st.metric("Announcements", len(st.session_state.announcements))
+            st.metric("Announcements", len(st.session_state.announcements) if st.session_state.announcements is not None else 0)
         with col4:
             uptime = f"{(datetime.now() - st.session_state.start_time).seconds // 60}m" if st.session_state.start_time else "0m"
             st.metric("System Uptime", uptime)
         
+        st.subheader("🚶 Recent Motion Episodes")
+        if st.session_state.video_processor and st.session_state.video_processor.events.recent:
+            for episode in reversed(list(st.session_state.video_processor.events.recent)[-5:]):
+                duration = (episode.end - episode.start).total_seconds()
+                st.write(f"**{episode.start.strftime('%H:%M:%S')}** - {duration:.1f}s, peak area {episode.peak_area}px")
+        else:
+            st.info("No motion episodes yet")
+        
         st.subheader("⏰ Upcoming Reminders")
         if st.session_state.reminder_system:
-            upcoming = st.session_state.reminder_system.get_upcoming_reminders(5)
+            upcoming = reminder_view(
+                "upcoming", lambda: st.session_state.reminder_system.get_upcoming_occurrences(5, st.session_state.current_user)
+            )
             if upcoming:
-                for reminder in upcoming:
-                    st.write(f"**{reminder['title']}** - {reminder['message']}")
+                for occurrence, reminder in upcoming:
+                    st.write(f"**{reminder['title']}** - {reminder['message']} ({occurrence.strftime('%a %d %b %H:%M')})")
             else:
                 st.info("No upcoming reminders")
         else:
             st.info("Reminder system restricted")
 
+timer.lap("page")
+
 # ------------------ DATABASE SETUP ------------------
 with st.sidebar.expander("🔧 Database Setup"):
     if st.button("🛠️ Create Tables Automatically"):
         if db_available:
-            success, msg = create_tables(db_conn)
+            with db_pool.connection() as db_conn:
+                success, msg = create_tables(db_conn)
             if success: st.success(msg)
             else: st.error(msg)
         else:
             st.error("❌ Database not available")
+    if db_available:
+        st.caption("Connection pool")
+        st.json(db_pool.metrics())
+        st.caption("Write-behind queue")
+        st.json(write_queue.metrics())
+        st.caption("Login cache")
+        st.json(get_authenticator(db_pool).metrics())
+    st.caption("Audio clip cache")
+    st.json(st.session_state.audio_system.clips.metrics())
+    st.caption("Text-to-speech")
+    st.json(st.session_state.audio_system.tts.metrics())
+    st.caption("Speaker queue")
+    st.json(get_playback_service().metrics())
+
+timer.lap("database setup")
+with st.sidebar.expander("⏱️ Render Timings"):
+    st.json(timer.readout())
+    st.caption("Render cache")
+    st.json(render_cache.metrics())
 
 # Cleanup on app close
-@atexit.register
 def cleanup():
-    if "reminder_system" in st.session_state:
-        st.session_state.reminder_system.stop()
-    if 'db_conn' in locals() and db_conn:
-        db_conn.close()
+    get_reminder_system().stop()
+    get_playback_service().stop()
+    get_audio_capture().stop()
+    get_tts().shutdown()
+    stop_shared_engine()
+    close_database()
+
+@st.cache_resource
+def register_cleanup():
+    """Register the exit hook once per process rather than on every rerun"""
+    atexit.register(cleanup)
+
+register_cleanup()
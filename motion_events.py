@@ -0,0 +1,96 @@
+from collections import deque
+from datetime import datetime
+from config import MOTION_EPISODE_GAP, MOTION_EPISODE_MAX, MOTION_EVENT_BUFFER
+
+class MotionEpisode:
+    """One continuous stretch of motion merged from per-frame detections"""
+    __slots__ = ("camera_id", "start", "end", "peak_area", "x1", "y1", "x2", "y2", "frames")
+    
+    def __init__(self, camera_id, start, boxes):
+        self.camera_id = camera_id
+        self.start = start
+        self.end = start
+        self.peak_area = 0
+        self.x1 = self.y1 = float("inf")
+        self.x2 = self.y2 = 0
+        self.frames = 0
+        self.extend(start, boxes)
+    
+    def extend(self, now, boxes):
+        """Merge one frame's bounding boxes into the episode"""
+        self.end = now
+        self.frames += 1
+        self.peak_area = max(self.peak_area, sum(w * h for (_, _, w, h) in boxes))
+        for (x, y, w, h) in boxes:
+            self.x1 = min(self.x1, x)
+            self.y1 = min(self.y1, y)
+            self.x2 = max(self.x2, x + w)
+            self.y2 = max(self.y2, y + h)
+    
+    @property
+    def bounding_box(self):
+        """Union of every box in the episode as (x, y, w, h)"""
+        return (int(self.x1), int(self.y1), int(self.x2 - self.x1), int(self.y2 - self.y1))
+    
+    def to_row(self):
+        """Row for the motion_events table"""
+        x, y, w, h = self.bounding_box
+        return (self.camera_id, self.start, self.end, self.peak_area, x, y, w, h, self.frames)
+
+class MotionEventTracker:
+    """Debounces per-frame detections into episodes held in a bounded ring buffer"""
+    def __init__(self, camera_id, gap=MOTION_EPISODE_GAP, max_duration=MOTION_EPISODE_MAX,
+                 capacity=MOTION_EVENT_BUFFER):
+        self.camera_id = camera_id
+        self.gap = gap
+        self.max_duration = max_duration
+        self.current = None
+        self.episode_count = 0
+        
+        # Recent closed episodes for the UI, and closed episodes not yet written to the DB
+        self.recent = deque(maxlen=capacity)
+        self.pending = deque(maxlen=capacity)
+    
+    def update(self, boxes, now=None):
+        """Feed one analysed frame's boxes; returns the episode closed by this frame, if any"""
+        now = now or datetime.now()
+        closed = None
+        
+        if self.current is not None:
+            idle = (now - self.current.end).total_seconds()
+            duration = (now - self.current.start).total_seconds()
+            if (not boxes and idle > self.gap) or duration > self.max_duration:
+                closed = self._close()
+        
+        if boxes:
+            if self.current is None:
+                self.current = MotionEpisode(self.camera_id, now, boxes)
+                self.episode_count += 1
+            else:
+                self.current.extend(now, boxes)
+        return closed
+    
+    def _close(self):
+        """Move the open episode into the ring buffers"""
+        episode = self.current
+        self.current = None
+        self.recent.append(episode)
+        self.pending.append(episode)
+        return episode
+    
+    def close(self):
+        """Close any open episode (stream ended)"""
+        if self.current is not None:
+            return self._close()
+        return None
+    
+    def requeue(self, episodes):
+        """Put back episodes whose database write failed"""
+        self.pending.extendleft(reversed(episodes))
+    
+    def drain(self):
+        """Take all episodes waiting to be written to the database"""
+        episodes = []
+        while self.pending:
+            episodes.append(self.pending.popleft())
+        return episodes
@@ -0,0 +1,175 @@
+import os
+import threading
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import (MOTION_ANALYSIS_SIZE, MOTION_MIN_AREA, MOTION_DIFF_THRESHOLD,
+                    MULTI_CAMERA_WORKERS, MULTI_CAMERA_BATCH_INTERVAL)
+
+def extract_boxes(mask, min_area, scale_x, scale_y):
+    """Dilate one camera's motion mask and return full-resolution boxes (runs in the thread pool)"""
+    thresh = cv2.dilate(mask, None, iterations=2)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    boxes = []
+    for contour in contours:
+        if cv2.contourArea(contour) < min_area:
+            continue
+        
+        (x, y, w, h) = cv2.boundingRect(contour)
+        boxes.append((int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y)))
+    return boxes
+
+class CameraState:
+    """Motion state of one registered stream, mirrored onto its VideoProcessor"""
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.motion_detected = False
+        self.last_motion_time = None
+        self.motion_boxes = []
+        
+        # (analysed_at, boxes) of the latest batch, replaced as one object so
+        # readers can tell a fresh result from one they have already consumed
+        self.result = None
+        
+        # Latest preprocessed proxy frame waiting for the next batch
+        self.frame = None
+        self.previous_frame = None
+        self.scale = (1.0, 1.0)
+        self.min_area = MOTION_MIN_AREA
+
+class MultiCameraEngine:
+    """Batches downscaled frames from many streams through one vectorized diff/threshold pass"""
+    def __init__(self, analysis_size=MOTION_ANALYSIS_SIZE, threshold=MOTION_DIFF_THRESHOLD,
+                 min_area=MOTION_MIN_AREA, workers=MULTI_CAMERA_WORKERS,
+                 interval=MULTI_CAMERA_BATCH_INTERVAL):
+        self.analysis_size = analysis_size
+        self.threshold = threshold
+        self.min_area = min_area
+        self.interval = interval
+        self.workers = workers or os.cpu_count() or 1
+        # cv2 releases the GIL, so threads parallelise contour work without forking or pickling masks
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="multi-camera") if self.workers > 1 else None
+        
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.running = True
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def register(self, camera_id):
+        """Register a stream and return its CameraState"""
+        with self.lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                state = CameraState(camera_id)
+                self.cameras[camera_id] = state
+            return state
+    
+    def unregister(self, camera_id):
+        """Forget a stream"""
+        with self.lock:
+            self.cameras.pop(camera_id, None)
+    
+    def submit_frame(self, camera_id, img):
+        """Downscale, grey and blur a frame, then park it for the next batch"""
+        height, width = img.shape[:2]
+        if self.analysis_size is None:
+            small = img
+            scale_x = scale_y = 1.0
+        else:
+            small = cv2.resize(img, self.analysis_size, interpolation=cv2.INTER_AREA)
+            scale_x = width / self.analysis_size[0]
+            scale_y = height / self.analysis_size[1]
+        
+        kernel = max(3, int(round(21 / scale_x)) | 1)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, (kernel, kernel), 0)
+        
+        with self.lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                return
+            state.frame = blurred
+            state.scale = (scale_x, scale_y)
+            state.min_area = self.min_area / (scale_x * scale_y)
+    
+    def process_batch(self):
+        """Run one batched analysis pass over every camera with a new frame"""
+        with self.lock:
+            ready = [state for state in self.cameras.values() if state.frame is not None]
+            frames = [state.frame for state in ready]
+            for state in ready:
+                state.frame = None
+        
+        # Stack cameras that share a proxy resolution; first frames only seed the reference
+        groups = {}
+        for state, frame in zip(ready, frames):
+            if state.previous_frame is None or state.previous_frame.shape != frame.shape:
+                state.previous_frame = frame
+                continue
+            groups.setdefault(frame.shape, []).append((state, frame))
+        
+        for batch in groups.values():
+            states = [state for state, _ in batch]
+            current = np.stack([frame for _, frame in batch])
+            previous = np.stack([state.previous_frame for state in states])
+            
+            # Vectorized absdiff/threshold across all cameras at once (uint8-safe)
+            diff = np.maximum(current, previous)
+            diff -= np.minimum(current, previous)
+            masks = np.where(diff > self.threshold, np.uint8(255), np.uint8(0))
+            
+            args = (list(masks), [s.min_area for s in states],
+                    [s.scale[0] for s in states], [s.scale[1] for s in states])
+            if self.executor:
+                results = self.executor.map(extract_boxes, *args)
+            else:
+                results = map(extract_boxes, *args)
+            
+            analysed_at = datetime.now()
+            for state, frame, boxes in zip(states, current, results):
+                state.previous_frame = frame
+                state.result = (analysed_at, boxes)
+                state.motion_boxes = boxes
+                state.motion_detected = bool(boxes)
+                if boxes:
+                    state.last_motion_time = analysed_at
+    
+    def _run(self):
+        """Batch loop"""
+        while self.running:
+            self.wakeup.wait(self.interval)
+            if not self.running:
+                break
+            try:
+                self.process_batch()
+            except Exception as e:
+                print(f"Multi-camera batch failed: {e}")
+    
+    def stop(self):
+        """Stop the batch loop and the thread pool"""
+        self.running = False
+        self.wakeup.set()
+        self.thread.join(timeout=1)
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+def get_shared_engine():
+    """Process-wide MultiCameraEngine shared by every VideoProcessor"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = MultiCameraEngine()
+        return _shared_engine
+
+def stop_shared_engine():
+    """Stop the shared engine and its thread pool, if one was ever started"""
+    with _shared_engine_lock:
+        if _shared_engine is not None:
+            _shared_engine.stop()
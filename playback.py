@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import threading
+import pygame
+from concurrent.futures import Future
+from io import BytesIO
+from audio_codecs import decode_clip
+from config import AUDIO_PLAYBACK_QUEUE_SIZE, AUDIO_PLAYBACK_POLL
+
+# Lower value plays first; a queued clip preempts anything playing at a higher value
+PRIORITY_URGENT = 0
+PRIORITY_REMINDER = 1
+PRIORITY_BROADCAST = 2
+
+class PlaybackJob:
+    """One clip waiting for (or holding) the speaker"""
+    __slots__ = ("priority", "seq", "audio", "label", "future")
+    
+    def __init__(self, priority, seq, audio, label=None):
+        self.priority = priority
+        self.seq = seq
+        self.audio = audio
+        self.label = label
+        self.future = Future()
+    
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+def load_audio(audio):
+    """Read a clip fully into memory as WAV bytes, decoding compressed voice messages"""
+    if not isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = audio.getvalue() if hasattr(audio, "getvalue") else audio.read()
+    return decode_clip(audio)
+
+class PlaybackService:
+    """Plays clips one at a time on its own thread through a long-lived mixer"""
+    def __init__(self, sample_rate=44100, channels=1, max_queue=AUDIO_PLAYBACK_QUEUE_SIZE,
+                 poll_interval=AUDIO_PLAYBACK_POLL):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.queue = []
+        self.current = None
+        self.preempt = False
+        self.mixer_ready = False
+        self.played = 0
+        self.preempted = 0
+        self.failed = 0
+        self.running = True
+        self._seq = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def submit(self, audio, priority=PRIORITY_BROADCAST, label=None):
+        """Queue a clip and return a Future that resolves to True once it has played"""
+        job = PlaybackJob(priority, next(self._seq), audio, label)
+        with self.condition:
+            if not self.running:
+                job.future.set_result(False)
+                return job.future
+            if len(self.queue) >= self.max_queue and priority >= PRIORITY_BROADCAST:
+                # A backed-up speaker refuses chatter but never drops reminders
+                job.future.set_result(False)
+                return job.future
+            heapq.heappush(self.queue, job)
+            if self.current is not None and priority < self.current.priority:
+                self.preempt = True
+            self.condition.notify_all()
+        return job.future
+    
+    def _init_mixer(self):
+        """Open the audio device once for the life of the service"""
+        if not self.mixer_ready:
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=self.channels)
+            self.mixer_ready = True
+    
+    def _next_job(self):
+        """Block until a job is queued; None once stopped"""
+        with self.condition:
+            while self.running and not self.queue:
+                self.condition.wait()
+            if not self.running:
+                return None
+            job = heapq.heappop(self.queue)
+            self.current = job
+            self.preempt = False
+            return job
+    
+    def _run(self):
+        """Playback loop: play the most urgent clip, yielding to anything more urgent"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if not job.future.running() and not job.future.set_running_or_notify_cancel():
+                with self.condition:
+                    self.current = None
+                continue
+            
+            try:
+                self._init_mixer()
+                # Decode from memory; no temp file shared between sessions
+                sound = pygame.mixer.Sound(file=BytesIO(load_audio(job.audio)))
+                channel = sound.play()
+            except Exception as e:
+                print(f"Audio playback failed: {e}")
+                with self.condition:
+                    self.current = None
+                    self.failed += 1
+                job.future.set_result(False)
+                continue
+            
+            with self.condition:
+                while self.running and not self.preempt and channel is not None and channel.get_busy():
+                    self.condition.wait(self.poll_interval)
+                interrupted = self.preempt or not self.running
+                self.current = None
+                if interrupted and channel is not None:
+                    channel.stop()
+                if self.preempt and self.running:
+                    # Replay from the start after the urgent clip; the original seq keeps its place
+                    self.preempted += 1
+                    heapq.heappush(self.queue, job)
+                    continue
+                self.played += not interrupted
+            job.future.set_result(not interrupted)
+    
+    def metrics(self):
+        """Snapshot of queue depth and playback counters"""
+        with self.condition:
+            return {
+                "queued": len(self.queue),
+                "playing": self.current.label if self.current else None,
+                "played": self.played,
+                "preempted": self.preempted,
+                "failed": self.failed,
+            }
+    
+    def stop(self):
+        """Stop playback and resolve every queued clip as not played"""
+        with self.condition:
+            self.running = False
+            pending, self.queue = self.queue, []
+            self.condition.notify_all()
+        for job in pending:
+            if not job.future.done():
+                job.future.set_result(False)
+        self.thread.join(timeout=1)
+        if self.mixer_ready:
+            pygame.mixer.quit()
+            self.mixer_ready = False
+
+_playback_service = None
+_playback_service_lock = threading.Lock()
+
+def get_playback_service():
+    """Process-wide playback service; every session shares the one speaker"""
+    global _playback_service
+    with _playback_service_lock:
+        if _playback_service is None:
+            _playback_service = PlaybackService()
+        return _playback_service
+
+def play_reminder(reminder):
+    """Reminder listener: play a fired reminder once on the shared speaker, however many sessions are open"""
+    if reminder.get("audio_message"):
+        get_playback_service().submit(reminder["audio_message"], PRIORITY_URGENT, reminder["title"])
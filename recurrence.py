@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+
+FREQUENCIES = {
+    "HOURLY": timedelta(hours=1),
+    "DAILY": timedelta(days=1),
+    "WEEKLY": timedelta(weeks=1),
+}
+UNITS = {"HOURLY": "hours", "DAILY": "days", "WEEKLY": "weeks"}
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+RULE_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+class Recurrence:
+    """RRULE-style repeat rule (FREQ, INTERVAL, BYDAY, UNTIL, COUNT)
+    
+    Occurrences are anchored at start. next_after is O(1) however far
+    behind the previous occurrence is, so catching up after downtime is a
+    single step, and occurrences() expands the series lazily.
+    """
+    __slots__ = ("freq", "interval", "weekdays", "until", "count", "start", "step", "_base")
+    
+    def __init__(self, freq, start, interval=1, weekdays=None, until=None, count=None):
+        freq = freq.upper()
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unsupported frequency: {freq}")
+        if interval < 1:
+            raise ValueError("Interval must be at least 1")
+        
+        weekdays = tuple(sorted(set(weekdays))) if weekdays else None
+        if weekdays and freq == "HOURLY":
+            raise ValueError("BYDAY needs a DAILY or WEEKLY frequency")
+        if weekdays and freq == "DAILY":
+            if interval != 1:
+                raise ValueError("BYDAY with DAILY frequency needs INTERVAL=1")
+            # Every day, but only on these weekdays, is the same series as weekly on them
+            freq = "WEEKLY"
+        
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = weekdays
+        self.until = until
+        self.count = count
+        self.start = start
+        self.step = FREQUENCIES[freq] * interval
+        # Monday of the start week, at the start's time of day
+        self._base = start - timedelta(days=start.weekday())
+    
+    def _advance(self, after):
+        """First on-rule time strictly after `after`, ignoring UNTIL/COUNT"""
+        if after < self.start:
+            if not self.weekdays or self.start.weekday() in self.weekdays:
+                return self.start
+            after = self.start
+        
+        if not self.weekdays:
+            return self.start + self.step * ((after - self.start) // self.step + 1)
+        
+        # Only the current active week and the next one can hold the answer
+        week = (after - self._base) // timedelta(weeks=1)
+        active_week = week - week % self.interval
+        for candidate_week in (active_week, active_week + self.interval):
+            for day in self.weekdays:
+                candidate = self._base + timedelta(weeks=candidate_week, days=day)
+                if candidate > after and candidate >= self.start:
+                    return candidate
+        return None  # unreachable: the next active week always has a candidate
+    
+    def _index(self, occurrence):
+        """Zero-based position of an on-rule time in the series"""
+        if not self.weekdays:
+            return (occurrence - self.start) // self.step
+        
+        week = (occurrence - self._base) // timedelta(weeks=1)
+        skipped = sum(1 for day in self.weekdays if self._base + timedelta(days=day) < self.start)
+        return ((week // self.interval) * len(self.weekdays)
+                + self.weekdays.index(occurrence.weekday()) - skipped)
+    
+    def _allowed(self, occurrence):
+        """Whether an on-rule time is inside UNTIL/COUNT"""
+        if self.until is not None and occurrence > self.until:
+            return False
+        if self.count is not None and self._index(occurrence) >= self.count:
+            return False
+        return True
+    
+    def next_after(self, occurrence, now=None):
+        """Next occurrence after `occurrence` (and after `now`, skipping missed ones); None once exhausted"""
+        after = max(occurrence, now) if now is not None else occurrence
+        candidate = self._advance(after)
+        return candidate if self._allowed(candidate) else None
+    
+    def first(self):
+        """First occurrence: start itself, or the next BYDAY after it; None if the rule is empty"""
+        candidate = self._advance(self.start - timedelta(microseconds=1))
+        return candidate if self._allowed(candidate) else None
+    
+    def missed_between(self, occurrence, next_occurrence):
+        """Occurrences strictly between two on-rule times (those skipped by a catch-up)"""
+        if next_occurrence is None:
+            return 0
+        return max(0, self._index(next_occurrence) - self._index(occurrence) - 1)
+    
+    def occurrences(self, first):
+        """Lazily yield the series from `first` (an on-rule time) onwards"""
+        occurrence = first if self._allowed(first) else None
+        while occurrence is not None:
+            yield occurrence
+            occurrence = self.next_after(occurrence)
+    
+    @property
+    def name(self):
+        """Short label for the UI"""
+        label = self.freq.lower() if self.interval == 1 else f"every {self.interval} {UNITS[self.freq]}"
+        if self.weekdays:
+            label += " on " + ",".join(WEEKDAYS[day] for day in self.weekdays)
+        return label
+    
+    def to_rule(self):
+        """Serialise: plain "daily"/"hourly"/"weekly", or an RRULE-style string"""
+        if self.interval == 1 and not self.weekdays and self.until is None and self.count is None:
+            return self.freq.lower()
+        
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.weekdays:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.weekdays))
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime(RULE_TIME_FORMAT)}")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        # Anchor the series so BYDAY/COUNT survive the row being rescheduled
+        parts.append(f"DTSTART={self.start.strftime(RULE_TIME_FORMAT)}")
+        return ";".join(parts)
+    
+    def __repr__(self):
+        return f"Recurrence({self.to_rule()})"
+
+def _parse_time(value, tzinfo):
+    """Rule timestamps are wall-clock times in the reminder's timezone"""
+    return datetime.strptime(value, RULE_TIME_FORMAT).replace(tzinfo=tzinfo)
+
+def parse_repeat(repeat, start):
+    """Recurrence for a repeat option or RRULE-style string, or None for one-off reminders"""
+    if not repeat:
+        return None
+    if "=" not in repeat:
+        freq = repeat.upper()
+        return Recurrence(freq, start) if freq in FREQUENCIES else None
+    
+    fields = dict(part.split("=", 1) for part in repeat.upper().split(";") if "=" in part)
+    if "DTSTART" in fields:
+        start = _parse_time(fields["DTSTART"], start.tzinfo)
+    return Recurrence(
+        fields.get("FREQ", "DAILY"),
+        start,
+        interval=int(fields.get("INTERVAL", 1)),
+        weekdays=[WEEKDAYS.index(day) for day in fields["BYDAY"].split(",")] if "BYDAY" in fields else None,
+        until=_parse_time(fields["UNTIL"], start.tzinfo) if "UNTIL" in fields else None,
+        count=int(fields["COUNT"]) if "COUNT" in fields else None,
+    )
@@ -1,93 +1,374 @@
+import heapq
+import itertools
 import threading
-import time
-import streamlit as st
-from datetime import datetime, timedelta
-from config import TIMEZONE
+import uuid
+import weakref
+from collections import deque
+from datetime import datetime
+from config import TIMEZONE, REMINDER_EVENT_BACKLOG
+from recurrence import parse_repeat
+
+class Reminder:
+    """Compact reminder record
+    
+    Fields live in slots rather than a dict; item access (reminder["title"],
+    reminder.get(...)) is kept so existing callers work unchanged.
+    """
+    __slots__ = ("id", "username", "title", "message", "trigger_time", "repeat", "recurrence",
+                 "audio_message", "created_at", "status", "triggered", "triggered_at", "db_id",
+                 "row_key")
+    
+    def __init__(self, reminder_id, username, title, message, trigger_time, repeat, audio_message, created_at):
+        self.id = reminder_id
+        self.username = username
+        self.title = title
+        self.message = message
+        self.trigger_time = trigger_time
+        self.recurrence = parse_repeat(repeat, trigger_time)
+        self.repeat = self.recurrence.to_rule() if self.recurrence else repeat
+        self.audio_message = audio_message
+        self.created_at = created_at
+        self.status = "pending"
+        self.triggered = False
+        self.triggered_at = None
+        self.db_id = None
+        # Identifies the database row before its auto-increment id is known
+        self.row_key = uuid.uuid4().hex
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+class ReminderOccurrence:
+    """One firing of a reminder, as published to sessions and listeners
+    
+    Repeating reminders are not cloned per firing: the record moves on to
+    its next occurrence and this small view remembers the fired one.
+    """
+    __slots__ = ("reminder", "trigger_time", "triggered_at", "next_trigger_time", "missed")
+    
+    def __init__(self, reminder, trigger_time, triggered_at, next_trigger_time=None, missed=0):
+        self.reminder = reminder
+        self.trigger_time = trigger_time
+        self.triggered_at = triggered_at
+        self.next_trigger_time = next_trigger_time
+        self.missed = missed
+    
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        return self.reminder[key]
+    
+    def get(self, key, default=None):
+        if key in self.__slots__:
+            return getattr(self, key)
+        return self.reminder.get(key, default)
+
+class ReminderSubscription:
+    """One session's inbox of fired reminders"""
+    def __init__(self, username, backlog=REMINDER_EVENT_BACKLOG):
+        self.username = username
+        self._events = deque(maxlen=backlog)
+        self._lock = threading.Lock()
+    
+    def put(self, reminder):
+        """Deliver a fired reminder (called from the scheduler thread)"""
+        with self._lock:
+            self._events.append(reminder)
+    
+    def drain(self):
+        """Take every reminder fired since the last drain"""
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+class ReminderEvents:
+    """Thread-safe pub/sub channel for fired reminders
+    
+    Sessions subscribe per user and drain on rerun; subscriptions are held
+    weakly so a closed session's inbox disappears with its session state.
+    Listeners are process-wide callbacks (e.g. persistence) keyed by name.
+    """
+    def __init__(self):
+        self._subscriptions = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, username):
+        """Open an inbox for a user's fired reminders"""
+        subscription = ReminderSubscription(username)
+        with self._lock:
+            self._subscriptions.setdefault(username, weakref.WeakSet()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        """Close an inbox"""
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.username)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+    
+    def add_listener(self, name, callback):
+        """Register (or replace) a callback invoked for every fired reminder"""
+        with self._lock:
+            self._listeners[name] = callback
+    
+    def publish(self, reminder):
+        """Deliver a fired reminder to its user's sessions and to every listener"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(reminder.get("username"), ()))
+            listeners = list(self._listeners.values())
+        for subscription in subscribers:
+            subscription.put(reminder)
+        for callback in listeners:
+            try:
+                callback(reminder)
+            except Exception as e:
+                print(f"Reminder listener failed: {e}")
 
 class ReminderSystem:
     def __init__(self):
-        self.reminders = []
-        self.active_reminders = []
         self.reminder_thread = None
         self.running = False
         self.timezone = TIMEZONE
         
-    def add_reminder(self, title, message, trigger_time, repeat="once", audio_message=None):
-        """Add a new reminder"""
-        reminder = {
-            "id": len(self.reminders) + 1,
-            "title": title,
-            "message": message,
-            "trigger_time": trigger_time,
-            "repeat": repeat,
-            "audio_message": audio_message,
-            "created_at": datetime.now(self.timezone),
-            "status": "pending",
-            "triggered": False
-        }
+        # Priority queue of (trigger_time, sequence, reminder); the sequence
+        # breaks ties so reminder dicts are never compared directly
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        
+        # Incrementally maintained indexes: every reminder by id, and pending
+        # reminders per user (id -> reminder) so counts and cancels skip history
+        self._ids = itertools.count(1)
+        self._by_id = {}
+        self._pending = {}
+        self.loaded_users = set()
+        self.events = ReminderEvents()
+        self._change_listeners = {}
+    
+    @property
+    def reminders(self):
+        """Every reminder ever added, oldest first"""
+        with self._condition:
+            return list(self._by_id.values())
+    
+    @property
+    def active_reminders(self):
+        """Reminders still waiting in the scheduler queue, soonest first"""
+        with self._condition:
+            entries = sorted(self._queue, key=lambda entry: entry[:2])
+            return [reminder for trigger_time, _, reminder in entries if self._is_live(trigger_time, reminder)]
+    
+    def _localize(self, trigger_time):
+        """Convert UI datetimes (naive local time) to the system timezone
+        
+        Truncated to whole seconds so the in-memory time matches the stored DATETIME.
+        """
+        return trigger_time.replace(microsecond=0).astimezone(self.timezone)
+    
+    def _is_live(self, trigger_time, reminder):
+        """Whether a queue entry should still fire (cancelled and rescheduled entries are stale)"""
+        return reminder.status == "pending" and reminder.trigger_time == trigger_time
+    
+    def _index(self, reminder):
+        """Add a new reminder to the indexes (caller holds the lock)"""
+        self._by_id[reminder.id] = reminder
+        if reminder.status == "pending":
+            self._pending.setdefault(reminder.username, {})[reminder.id] = reminder
+    
+    def _set_status(self, reminder, status):
+        """Change a reminder's status, keeping the pending index in step (caller holds the lock)"""
+        if reminder.status == "pending" and status != "pending":
+            user_pending = self._pending.get(reminder.username)
+            if user_pending is not None:
+                user_pending.pop(reminder.id, None)
+                if not user_pending:
+                    del self._pending[reminder.username]
+        reminder.status = status
+    
+    def _schedule(self, reminder):
+        """Push a reminder onto the queue, waking the checker if it is the new head"""
+        with self._condition:
+            heapq.heappush(self._queue, (reminder.trigger_time, next(self._sequence), reminder))
+            if self._queue[0][2] is reminder:
+                self._condition.notify_all()
         
-        self.reminders.append(reminder)
+    def add_change_listener(self, name, callback):
+        """Register (or replace) a callback invoked with a username whenever that user's reminders change"""
+        with self._condition:
+            self._change_listeners[name] = callback
+    
+    def _changed(self, usernames):
+        """Notify change listeners (call without holding the lock)"""
+        with self._condition:
+            listeners = list(self._change_listeners.values())
+        for username in set(usernames):
+            for callback in listeners:
+                try:
+                    callback(username)
+                except Exception as e:
+                    print(f"Reminder change listener failed: {e}")
+    
+    def _new_reminder(self, title, message, trigger_time, repeat, audio_message, username):
+        """Build a reminder record"""
+        return Reminder(next(self._ids), username, title, message, trigger_time, repeat,
+                        audio_message, datetime.now(self.timezone))
+    
+    def add_reminder(self, title, message, trigger_time, repeat="once", audio_message=None, username=None):
+        """Add a new reminder; raises ValueError for a repeating series that has already ended"""
+        trigger_time = self._localize(trigger_time)
+        reminder = self._new_reminder(title, message, trigger_time, repeat, audio_message, username)
+        
+        # A BYDAY rule may not include the chosen start itself, and a start
+        # already in the past (e.g. today's weekly slot) rolls on to the next one
+        now = datetime.now(self.timezone)
+        if reminder.recurrence is not None:
+            trigger_time = reminder.recurrence.first()
+            if trigger_time is not None and trigger_time <= now:
+                trigger_time = reminder.recurrence.next_after(trigger_time, now=now)
+            if trigger_time is None:
+                raise ValueError("The repeat rule has no occurrences left (UNTIL or COUNT already passed)")
+            reminder.trigger_time = trigger_time
+        
+        with self._condition:
+            self._index(reminder)
         
-        # Add to active reminders if not triggered
-        if trigger_time > datetime.now(self.timezone):
-            self.active_reminders.append(reminder)
+        # Queue the reminder if it has not already passed
+        if trigger_time > now:
+            self._schedule(reminder)
         
+        self._changed([username])
         return reminder
     
+    def load_reminders(self, username, rows, audio_loader=None):
+        """Rebuild scheduler state from pending database rows; returns the number loaded
+        
+        rows can be a lazy page iterator. Audio is not read here: audio_loader
+        turns each row into a lazy handle that is only resolved at playback.
+        Overdue rows are queued too, so reminders missed during downtime fire
+        on the next check.
+        """
+        if username in self.loaded_users:
+            return 0
+        
+        entries = []
+        for row in rows:
+            # Stored trigger times are wall-clock times in the system timezone
+            trigger_time = row["trigger_time"].replace(tzinfo=self.timezone)
+            audio_message = audio_loader(row) if audio_loader else None
+            reminder = self._new_reminder(row["title"], row["message"], trigger_time,
+                                          row["repeat_type"] or "once", audio_message, username)
+            reminder.db_id = row["id"]
+            entries.append((trigger_time, next(self._sequence), reminder))
+        
+        with self._condition:
+            for _, _, reminder in entries:
+                self._index(reminder)
+            # One O(n) heapify instead of n pushes
+            self._queue.extend(entries)
+            heapq.heapify(self._queue)
+            self.loaded_users.add(username)
+            self._condition.notify_all()
+        self._changed([username])
+        return len(entries)
+    
     def check_reminders(self):
         """Check and trigger reminders"""
         current_time = datetime.now(self.timezone)
         triggered = []
         
-        for reminder in self.active_reminders[:]:
-            if reminder["trigger_time"] <= current_time and not reminder["triggered"]:
-                # Trigger this reminder
-                reminder["triggered"] = True
-                reminder["triggered_at"] = current_time
-                reminder["status"] = "triggered"
-                triggered.append(reminder)
+        with self._condition:
+            # Only due entries are popped; stale ones are discarded lazily
+            while self._queue and self._queue[0][0] <= current_time:
+                trigger_time, _, reminder = heapq.heappop(self._queue)
+                if not self._is_live(trigger_time, reminder):
+                    continue
                 
-                # Handle repeat
-                if reminder["repeat"] == "daily":
-                    # Schedule for next day
-                    new_time = reminder["trigger_time"] + timedelta(days=1)
-                    new_reminder = reminder.copy()
-                    new_reminder["trigger_time"] = new_time
-                    new_reminder["triggered"] = False
-                    new_reminder["status"] = "pending"
-                    self.active_reminders.append(new_reminder)
-                elif reminder["repeat"] == "hourly":
-                    # Schedule for next hour
-                    new_time = reminder["trigger_time"] + timedelta(hours=1)
-                    new_reminder = reminder.copy()
-                    new_reminder["trigger_time"] = new_time
-                    new_reminder["triggered"] = False
-                    new_reminder["status"] = "pending"
-                    self.active_reminders.append(new_reminder)
-        
-        # Remove triggered reminders from active list
-        self.active_reminders = [r for r in self.active_reminders if not r.get("triggered", False)]
+                # Handle repeat: jump straight past any occurrences missed while asleep
+                recurrence = reminder.recurrence
+                new_time = recurrence.next_after(trigger_time, now=current_time) if recurrence else None
+                missed = recurrence.missed_between(trigger_time, new_time) if recurrence else 0
+                reminder.triggered_at = current_time
+                triggered.append(ReminderOccurrence(reminder, trigger_time, current_time, new_time, missed))
+                
+                if new_time is None:
+                    # One-off reminder, or the series is exhausted (UNTIL/COUNT)
+                    reminder.triggered = True
+                    self._set_status(reminder, "triggered")
+                else:
+                    # The same record moves on to its next occurrence
+                    reminder.trigger_time = new_time
+                    heapq.heappush(self._queue, (new_time, next(self._sequence), reminder))
         
+        if triggered:
+            self._changed(occurrence.reminder.username for occurrence in triggered)
         return triggered
     
-    def get_pending_reminders(self):
-        """Get reminders that are still pending"""
-        return [r for r in self.reminders if r["status"] == "pending"]
+    def next_trigger_time(self):
+        """Trigger time of the next live reminder, or None if nothing is queued"""
+        with self._condition:
+            while self._queue and not self._is_live(self._queue[0][0], self._queue[0][2]):
+                heapq.heappop(self._queue)
+            return self._queue[0][0] if self._queue else None
+    
+    def get_reminder(self, reminder_id):
+        """Look up a reminder by id"""
+        return self._by_id.get(reminder_id)
+    
+    def pending_count(self, username=None):
+        """Number of pending reminders (optionally only one user's)"""
+        with self._condition:
+            if username is not None:
+                return len(self._pending.get(username, ()))
+            return sum(len(user_pending) for user_pending in self._pending.values())
+    
+    def get_pending_reminders(self, username=None):
+        """Get reminders that are still pending (optionally only one user's)"""
+        with self._condition:
+            if username is not None:
+                return list(self._pending.get(username, {}).values())
+            return [r for user_pending in self._pending.values() for r in user_pending.values()]
     
-    def get_upcoming_reminders(self, count=5):
+    def get_upcoming_reminders(self, count=5, username=None):
         """Get upcoming reminders"""
-        pending = self.get_pending_reminders()
-        pending.sort(key=lambda x: x["trigger_time"])
-        return pending[:count]
-    
-    def cancel_reminder(self, reminder_id):
-        """Cancel a reminder"""
-        for reminder in self.reminders:
-            if reminder["id"] == reminder_id:
-                reminder["status"] = "cancelled"
-                self.active_reminders = [r for r in self.active_reminders if r["id"] != reminder_id]
-                return True
-        return False
+        return heapq.nsmallest(count, self.get_pending_reminders(username), key=lambda x: x.trigger_time)
+    
+    def _occurrences(self, reminder):
+        """Lazy (trigger_time, reminder) series for one reminder"""
+        if reminder.recurrence is None:
+            yield reminder.trigger_time, reminder
+            return
+        for occurrence in reminder.recurrence.occurrences(reminder.trigger_time):
+            yield occurrence, reminder
+    
+    def get_upcoming_occurrences(self, count=5, username=None):
+        """Next `count` (trigger_time, reminder) pairs, expanding repeating reminders lazily"""
+        series = [self._occurrences(reminder) for reminder in self.get_pending_reminders(username)]
+        merged = heapq.merge(*series, key=lambda pair: pair[0])
+        return list(itertools.islice(merged, count))
+    
+    def cancel_reminder(self, reminder_id, username=None):
+        """Cancel a reminder (only the owner's, when a username is given)"""
+        reminder = self._by_id.get(reminder_id)
+        if reminder is None or (username is not None and reminder.username != username):
+            return False
+        with self._condition:
+            self._set_status(reminder, "cancelled")
+            # Let the checker recompute its deadline if the head went away
+            if self._queue and self._queue[0][2] is reminder:
+                self._condition.notify_all()
+        self._changed([reminder.username])
+        return True
     
     def start_background_check(self):
         """Start background thread to check reminders"""
@@ -99,17 +380,38 @@ class ReminderSystem:
     def _background_check(self):
         """Background thread to check reminders"""
         while self.running:
-            triggered = self.check_reminders()
-            if triggered:
-                # Store triggered reminders for UI
-                if "triggered_reminders" not in st.session_state:
-                    st.session_state.triggered_reminders = []
-                st.session_state.triggered_reminders.extend(triggered)
+            # Hand fired reminders to subscribed sessions; never touch session state here
+            for reminder in self.check_reminders():
+                self.events.publish(reminder)
             
-            time.sleep(1)  # Check every second
+            # Sleep until the next deadline; add/cancel/stop notify to wake early
+            with self._condition:
+                if not self.running:
+                    break
+                next_time = self._queue[0][0] if self._queue else None
+                if next_time is None:
+                    self._condition.wait()
+                else:
+                    delay = (next_time - datetime.now(self.timezone)).total_seconds()
+                    if delay > 0:
+                        self._condition.wait(timeout=delay)
     
     def stop(self):
         """Stop the reminder system"""
-        self.running = False
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
         if self.reminder_thread:
             self.reminder_thread.join(timeout=1)
+
+_reminder_system = None
+_reminder_system_lock = threading.Lock()
+
+def get_reminder_system():
+    """Process-wide reminder scheduler shared by every session, started on first use"""
+    global _reminder_system
+    with _reminder_system_lock:
+        if _reminder_system is None:
+            _reminder_system = ReminderSystem()
+            _reminder_system.start_background_check()
+        return _reminder_system
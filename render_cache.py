@@ -0,0 +1,73 @@
+import threading
+import time
+
+class RenderCache:
+    """Memoises values computed during a Streamlit rerun until their scope is invalidated
+
+    Writers (the reminder scheduler, the DB write-behind queue) call
+    invalidate(scope) when the underlying state changes, so an idle rerun
+    is served entirely from memory. An optional TTL bounds values nobody
+    invalidates, such as database reachability.
+    """
+    def __init__(self):
+        self._versions = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def invalidate(self, scope):
+        """Mark every value cached under scope as stale"""
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+    
+    def get(self, scope, key, compute, ttl=None):
+        """Cached value for (scope, key), calling compute() when missing, stale or expired"""
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(scope, 0)
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry[0] == version and (entry[2] is None or entry[2] > now):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        # Computed outside the lock; an invalidation meanwhile leaves this value already stale
+        value = compute()
+        with self._lock:
+            self._entries[(scope, key)] = (version, value, None if ttl is None else now + ttl)
+        return value
+    
+    def metrics(self):
+        """Snapshot of entry count and hit counters"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+class SectionTimer:
+    """Wall time spent rendering each section of one rerun, recorded as laps"""
+    def __init__(self):
+        self.timings = {}
+        self.started = self.last = time.perf_counter()
+    
+    def lap(self, name):
+        """Charge the time since the previous lap to name (repeated names accumulate)"""
+        now = time.perf_counter()
+        self.timings[name] = self.timings.get(name, 0.0) + now - self.last
+        self.last = now
+    
+    def readout(self):
+        """Milliseconds per section plus the whole rerun so far"""
+        readout = {name: round(seconds * 1000, 2) for name, seconds in self.timings.items()}
+        readout["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return readout
+
+_render_cache = None
+_render_cache_lock = threading.Lock()
+
+def get_render_cache():
+    """Process-wide render cache shared by every session"""
+    global _render_cache
+    with _render_cache_lock:
+        if _render_cache is None:
+            _render_cache = RenderCache()
+        return _render_cache
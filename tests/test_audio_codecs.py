@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import audio_codecs
+from audio_codecs import AdpcmCodec, clamped_running_sum
+
+def running_sum_loop(increments, low, high):
+    out, x = [], 0
+    for a in increments.tolist():
+        x = min(max(x + a, low), high)
+        out.append(x)
+    return out
+
+def signals():
+    """Speech-like, silent, full-scale square and noise inputs; the last two saturate the predictor"""
+    rng = np.random.default_rng(0)
+    t = np.arange(5000)
+    yield (np.sin(t / 9) * 12000 + rng.standard_normal(len(t)) * 1500).astype(np.int16)
+    yield np.zeros(300, dtype=np.int16)
+    yield np.where((t // 40) % 2, 32767, -32768).astype(np.int16)
+    yield rng.integers(-32768, 32768, 4001).astype(np.int16)
+
+@pytest.mark.parametrize("n", [0, 1, 2, 1023, 1024, 1025, 5000])
+def test_clamped_running_sum_matches_loop(n):
+    increments = np.random.default_rng(n).integers(-30000, 30000, n)
+    
+    assert clamped_running_sum(increments, -32768, 32767).tolist() == running_sum_loop(increments, -32768, 32767)
+
+def test_clamped_running_sum_saturates_at_both_bounds():
+    increments = np.array([50, 50, -200, 10, 95, -1] * 300)
+    
+    assert clamped_running_sum(increments, 0, 88, block=16).tolist() == running_sum_loop(increments, 0, 88)
+
+@pytest.mark.parametrize("samples", list(signals()), ids=["speech", "silence", "square", "noise"])
+def test_decode_scan_matches_reference(samples):
+    codec = AdpcmCodec()
+    payload = codec.encode_python(samples)
+    
+    expected = codec.decode_python(payload, len(samples))
+    
+    assert np.array_equal(codec.decode_scan(payload, len(samples)), expected)
+
+def test_decode_scan_matches_reference_on_arbitrary_codes():
+    codec = AdpcmCodec()
+    payload = np.random.default_rng(1).integers(0, 256, 3000, dtype=np.uint8).tobytes()
+    
+    assert np.array_equal(codec.decode_scan(payload, 6000), codec.decode_python(payload, 6000))
+
+@pytest.mark.skipif(audio_codecs.audioop is None, reason="audioop not available")
+@pytest.mark.parametrize("samples", list(signals()), ids=["speech", "silence", "square", "noise"])
+def test_audioop_matches_reference(samples):
+    codec = AdpcmCodec()
+    payload = codec.encode_python(samples)
+    
+    assert codec.encode(samples, 16000) == payload
+    decoded = np.frombuffer(audio_codecs.audioop.adpcm2lin(payload, 2, None)[0], dtype=np.int16)[:len(samples)]
+    assert np.array_equal(codec.decode_scan(payload, len(samples)), decoded)
+
+def test_clip_round_trip_through_adpcm():
+    samples = next(signals())
+    wav = audio_codecs.write_wav(samples, 16000)
+    
+    clip = audio_codecs.encode_clip(wav, codec="adpcm", sample_rate=16000)
+    decoded, rate, channels = audio_codecs.read_wav(audio_codecs.decode_clip(clip))
+    
+    assert (rate, channels, len(decoded)) == (16000, 1, len(samples))
+    assert np.abs(decoded.astype(np.int32) - samples).mean() < 1500
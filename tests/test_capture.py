@@ -0,0 +1,99 @@
+import time
+import wave
+import numpy as np
+from capture import AudioCapture, FakeInputDevice, RingBuffer
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(8)
+    ring.write(np.arange(5, dtype=np.int16))
+    ring.write(np.arange(5, 11, dtype=np.int16))
+    
+    samples, next_index = ring.read(3)
+    
+    assert samples.tolist() == list(range(3, 11))
+    assert next_index == 11
+    assert ring.overruns == 0
+
+def test_ring_buffer_keeps_tail_of_oversized_write():
+    ring = RingBuffer(4)
+    ring.write(np.arange(10, dtype=np.int16))
+    
+    samples, next_index = ring.read(6)
+    
+    assert samples.tolist() == [6, 7, 8, 9]
+    assert next_index == 10
+
+def test_ring_buffer_counts_overrun_and_skips_to_oldest():
+    ring = RingBuffer(4)
+    ring.write(np.arange(6, dtype=np.int16))
+    
+    samples, next_index = ring.read(0)
+    
+    assert ring.overruns == 1
+    assert samples.tolist() == [2, 3, 4, 5]
+    assert next_index == 6
+
+def test_ring_buffer_read_into_preallocated_output():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    ring.write(np.arange(6, 12, dtype=np.int16))
+    out = np.zeros(5, dtype=np.int16)
+    
+    samples, next_index = ring.read(5, max_samples=5, out=out)
+    
+    assert samples.tolist() == [5, 6, 7, 8, 9]
+    assert np.shares_memory(samples, out)
+    assert next_index == 10
+
+def make_capture(**kwargs):
+    """Capture at a low rate with small chunks so reads complete quickly"""
+    device = FakeInputDevice(samples=np.arange(1000, dtype=np.int16))
+    return AudioCapture(sample_rate=8000, chunk=80, buffer_seconds=1, device=device, **kwargs)
+
+def test_read_returns_contiguous_samples_from_fake_device():
+    capture = make_capture()
+    try:
+        samples = capture.read(0.05, start=0)
+    finally:
+        capture.stop()
+    
+    assert len(samples) == 400
+    assert samples[0] == 0
+    assert (np.diff(samples.astype(np.int64)) % 1000 == 1).all()
+
+def test_chunks_yields_device_blocks_in_order():
+    capture = make_capture()
+    try:
+        chunks = capture.chunks(start=0)
+        received = np.concatenate([next(chunks) for _ in range(3)])
+    finally:
+        capture.stop()
+    
+    assert len(received) >= 240
+    assert received[:240].tolist() == list(range(240))
+
+def test_record_wraps_samples_in_wav():
+    capture = make_capture(channels=2)
+    try:
+        wav_buffer = capture.record(0.05)
+    finally:
+        capture.stop()
+    
+    with wave.open(wav_buffer, "rb") as wf:
+        assert wf.getnchannels() == 2
+        assert wf.getframerate() == 8000
+        assert wf.getsampwidth() == 2
+        assert wf.getnframes() == 400
+
+def test_stop_closes_stream_and_releases_waiting_readers():
+    capture = make_capture()
+    capture.start()
+    assert capture.running
+    
+    capture.stop()
+    
+    assert not capture.running
+    assert not capture.device.thread.is_alive()
+    started = time.monotonic()
+    assert not capture.ring.wait(capture.position, timeout=5)
+    assert time.monotonic() - started < 1
@@ -0,0 +1,35 @@
+import pytest
+from datetime import datetime, timedelta
+from reminder_system import ReminderSystem
+from recurrence import WEEKDAYS
+
+def test_past_weekly_start_is_queued_for_next_occurrence():
+    system = ReminderSystem()
+    now = datetime.now(system.timezone)
+    start = datetime.now() - timedelta(hours=1)
+    rule = f"FREQ=WEEKLY;BYDAY={WEEKDAYS[system._localize(start).weekday()]}"
+    
+    reminder = system.add_reminder("Walk", "Evening walk", start, repeat=rule, username="alice")
+    
+    assert reminder.trigger_time > now
+    assert reminder.trigger_time - system._localize(start) == timedelta(weeks=1)
+    assert system.active_reminders == [reminder]
+    assert system.next_trigger_time() == reminder.trigger_time
+
+def test_past_one_off_is_not_queued():
+    system = ReminderSystem()
+    start = datetime.now() - timedelta(hours=1)
+    
+    system.add_reminder("Call", "Call the clinic", start, username="alice")
+    
+    assert system.active_reminders == []
+
+def test_ended_series_is_rejected():
+    system = ReminderSystem()
+    start = datetime.now() - timedelta(days=3)
+    
+    with pytest.raises(ValueError):
+        system.add_reminder("Pills", "Morning pills", start, repeat="FREQ=DAILY;COUNT=2", username="alice")
+    
+    assert system.pending_count("alice") == 0
+    assert system.active_reminders == []
@@ -0,0 +1,196 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from audio_mix import Mixer, Tone
+from config import TTS_BACKEND, TTS_VOICE, TTS_WORKERS, TTS_CACHE_DIR
+
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+class EspeakBackend:
+    """espeak-ng / espeak command line synthesiser"""
+    name = "espeak"
+    persistent = True
+    
+    def __init__(self):
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+    
+    def available(self):
+        return self.executable is not None
+    
+    def synthesize(self, text, voice=None, language="en"):
+        """WAV bytes for text"""
+        variant = f"{language}+{voice}" if voice else language
+        # Text goes in on stdin: as an argument, a leading "-" would be parsed as an option
+        result = subprocess.run(
+            [self.executable, "--stdout", "--stdin", "-v", variant],
+            input=text.encode(), capture_output=True, timeout=30, check=True
+        )
+        return result.stdout
+
+class Pyttsx3Backend:
+    """pyttsx3 (SAPI5 / NSSpeechSynthesizer / espeak driver)"""
+    name = "pyttsx3"
+    persistent = True
+    
+    def __init__(self):
+        # pyttsx3 engines are not thread-safe; one engine, one caller at a time
+        self.engine = None
+        self.lock = threading.Lock()
+    
+    def available(self):
+        return pyttsx3 is not None
+    
+    def synthesize(self, text, voice=None, language="en"):
+        """WAV bytes for text"""
+        with self.lock:
+            if self.engine is None:
+                self.engine = pyttsx3.init()
+            if voice:
+                self.engine.setProperty("voice", voice)
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+                with open(path, "rb") as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+class BeepBackend:
+    """Fallback when no speech engine is installed: a plain beep"""
+    name = "beep"
+    persistent = False  # Cheap to render, and must not shadow a real engine installed later
+    
+    def __init__(self):
+        self.mixer = Mixer()
+    
+    def available(self):
+        return True
+    
+    def synthesize(self, text, voice=None, language="en"):
+        return self.mixer.render_wav([Tone(440, 1.0)])
+
+TTS_BACKENDS = {backend.name: backend for backend in (EspeakBackend, Pyttsx3Backend, BeepBackend)}
+
+def pick_backend(name=TTS_BACKEND):
+    """Instantiate the named backend, or the first available one for "auto" """
+    if name != "auto":
+        if name not in TTS_BACKENDS:
+            raise ValueError(f"Unknown TTS backend: {name}")
+        backend = TTS_BACKENDS[name]()
+        if backend.available():
+            return backend
+        print(f"TTS backend {name} not available, falling back to beep")
+        return BeepBackend()
+    for backend_class in TTS_BACKENDS.values():
+        backend = backend_class()
+        if backend.available():
+            return backend
+
+def normalize_text(text):
+    """Canonical form of a phrase for caching: NFKC, no emoji/symbols, collapsed whitespace, lower case"""
+    text = unicodedata.normalize("NFKC", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) not in ("So", "Sk", "Cs", "Co", "Cn"))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class TextToSpeech:
+    """Offline speech synthesis on a worker pool with a persistent phrase cache"""
+    def __init__(self, backend=TTS_BACKEND, voice=TTS_VOICE, cache_dir=TTS_CACHE_DIR, workers=TTS_WORKERS):
+        self.backend = pick_backend(backend)
+        self.fallback = self.backend if isinstance(self.backend, BeepBackend) else BeepBackend()
+        self.voice = voice
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.synthesized = 0
+        self.cache_hits = 0
+    
+    def cache_key(self, text, language="en"):
+        """Hex key for a phrase under the current backend, voice and language"""
+        parts = (self.backend.name, self.voice or "", language, normalize_text(text))
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+    
+    def synthesize(self, text, language="en"):
+        """WAV bytes for text, from the phrase cache when possible (blocking)"""
+        # Normalising only picks the cache entry; the engine hears the original text
+        if not normalize_text(text):
+            return self.fallback.synthesize(text)
+        
+        key = self.cache_key(text, language)
+        path = self._path(key)
+        if self.backend.persistent and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.cache_hits += 1
+                return f.read()
+        
+        try:
+            audio = self.backend.synthesize(text, self.voice, language)
+        except Exception as e:
+            print(f"Speech synthesis failed: {e}")
+            return self.fallback.synthesize(text)
+        self.synthesized += 1
+        
+        if self.backend.persistent and audio:
+            # Write then rename so a concurrent reader never sees a partial clip
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        return audio
+    
+    def submit(self, text, language="en", synthesize=None):
+        """Synthesise on the worker pool; concurrent requests for one phrase share a Future"""
+        key = self.cache_key(text, language)
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            future = self.executor.submit(synthesize or self.synthesize, text, language)
+            self.in_flight[key] = future
+        future.add_done_callback(lambda _: self._finished(key))
+        return future
+    
+    def _finished(self, key):
+        with self.lock:
+            self.in_flight.pop(key, None)
+    
+    def metrics(self):
+        """Backend and cache counters"""
+        with self.lock:
+            return {
+                "backend": self.backend.name,
+                "in_flight": len(self.in_flight),
+                "synthesized": self.synthesized,
+                "disk_hits": self.cache_hits,
+            }
+    
+    def shutdown(self):
+        """Stop the worker pool, abandoning queued phrases"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+_tts = None
+_tts_lock = threading.Lock()
+
+def get_tts():
+    """Process-wide speech synthesiser shared by every session"""
+    global _tts
+    with _tts_lock:
+        if _tts is None:
+            _tts = TextToSpeech()
+        return _tts
@@ -1,46 +1,420 @@
+import time
+import threading
+import uuid
 import cv2
 import av
+import numpy as np
+from collections import deque
 from datetime import datetime
+from config import (MOTION_ANALYSIS_SIZE, MOTION_FRAME_SKIP, MOTION_MIN_AREA, MOTION_ENGINE,
+                    MOTION_DIFF_THRESHOLD, MOTION_BACKGROUND_ALPHA, MOTION_BUFFER_POOL,
+                    MOTION_ASYNC_ANALYSIS, MOTION_QUEUE_SIZE, MOTION_DROP_POLICY,
+                    MOTION_SHARED_ENGINE)
+from multi_camera import get_shared_engine
+from motion_events import MotionEventTracker
 
-class VideoProcessor:
+class BufferPool:
+    """Working arrays allocated once per resolution and reused through OpenCV dst= outputs"""
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.buffers = {}
+        self.allocations = 0
+        
+        # Rings of interchangeable buffers handed across threads: name -> (shape, dtype, free buffers)
+        self.rings = {}
+        self.lock = threading.Lock()
+    
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the named buffer, or None (let OpenCV allocate) when pooling is off"""
+        if not self.enabled:
+            self.allocations += 1
+            return None
+        
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+        return buffer
+    
+    def acquire(self, name, shape, count, dtype=np.uint8):
+        """Check out a buffer from a ring of count (allocated on first use); None while all are out"""
+        if not self.enabled:
+            self.allocations += 1
+            return np.empty(shape, dtype)
+        
+        with self.lock:
+            ring = self.rings.get(name)
+            if ring is None or ring[0] != shape or ring[1] != dtype:
+                ring = (shape, dtype, deque(np.empty(shape, dtype) for _ in range(count)))
+                self.rings[name] = ring
+                self.allocations += count
+            free = ring[2]
+            return free.popleft() if free else None
+    
+    def release(self, name, buffer):
+        """Return a ring buffer; buffers from a ring replaced since checkout are let go"""
+        if not self.enabled:
+            return
+        with self.lock:
+            ring = self.rings.get(name)
+            if ring is not None and buffer.shape == ring[0] and buffer.dtype == ring[1]:
+                ring[2].append(buffer)
+
+class FrameStats:
+    """Per-frame working-array allocations and processing latency"""
     def __init__(self):
+        self.frames = 0
+        self.allocations_last_frame = 0
+        self.allocations_total = 0
+        self.frames_since_allocation = 0
+        self.latency_last_ms = 0.0
+        self.latency_avg_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.analysis_latency_last_ms = 0.0
+        self.analysis_latency_avg_ms = 0.0
+        self.analyses = 0
+        self.dropped_frames = 0
+    
+    def record_analysis(self, latency_ms):
+        """Record one completed analysis, timed from frame arrival to result"""
+        self.analyses += 1
+        self.analysis_latency_last_ms = latency_ms
+        self.analysis_latency_avg_ms += (latency_ms - self.analysis_latency_avg_ms) / self.analyses
+    
+    def record(self, allocations, latency_ms):
+        """Record one processed frame"""
+        self.frames += 1
+        self.allocations_last_frame = allocations
+        self.allocations_total += allocations
+        self.frames_since_allocation = 0 if allocations else self.frames_since_allocation + 1
+        self.latency_last_ms = latency_ms
+        self.latency_avg_ms += (latency_ms - self.latency_avg_ms) / self.frames
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+    
+    def snapshot(self):
+        """Return the current stats as a dict"""
+        return {
+            "frames": self.frames,
+            "allocations_last_frame": self.allocations_last_frame,
+            "allocations_total": self.allocations_total,
+            "frames_since_allocation": self.frames_since_allocation,
+            "latency_last_ms": round(self.latency_last_ms, 3),
+            "latency_avg_ms": round(self.latency_avg_ms, 3),
+            "latency_max_ms": round(self.latency_max_ms, 3),
+            "analyses": self.analyses,
+            "analysis_latency_last_ms": round(self.analysis_latency_last_ms, 3),
+            "analysis_latency_avg_ms": round(self.analysis_latency_avg_ms, 3),
+            "dropped_frames": self.dropped_frames,
+        }
+
+class MotionAnalysisWorker:
+    """Runs motion analysis on a background thread fed by a bounded queue"""
+    DROP_POLICIES = ("drop_oldest", "drop_newest")
+    
+    def __init__(self, analyse, on_result, queue_size=MOTION_QUEUE_SIZE, drop_policy=MOTION_DROP_POLICY,
+                 on_discard=None):
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        
+        self.analyse = analyse
+        self.on_result = on_result
+        self.on_discard = on_discard
+        self.queue_size = max(1, int(queue_size))
+        self.drop_policy = drop_policy
+        self.queue = deque()
+        self.dropped = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def submit(self, item):
+        """Queue an item for analysis; returns False if it was dropped"""
+        with self.condition:
+            if len(self.queue) >= self.queue_size:
+                self.dropped += 1
+                discarded = item if self.drop_policy == "drop_newest" else self.queue.popleft()
+                if self.on_discard:
+                    self.on_discard(discarded)
+                if discarded is item:
+                    return False
+            self.queue.append(item)
+            self.condition.notify()
+        return True
+    
+    def _run(self):
+        """Worker loop: analyse queued items and hand results back"""
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                item = self.queue.popleft()
+            
+            try:
+                self.on_result(item, self.analyse(item))
+            except Exception as e:
+                print(f"Motion analysis failed: {e}")
+    
+    def stop(self):
+        """Stop the worker thread, discarding queued items"""
+        with self.condition:
+            self.running = False
+            self.queue.clear()
+            self.condition.notify_all()
+        self.thread.join(timeout=1)
+
+class FrameDiffEngine:
+    """Motion mask from the difference between consecutive frames"""
+    def __init__(self, threshold=MOTION_DIFF_THRESHOLD, pool=None):
+        self.threshold = threshold
+        self.pool = pool or BufferPool()
         self.previous_frame = None
+    
+    def _keep(self, gray):
+        """Hold on to this frame as the next reference"""
+        if not self.pool.enabled:
+            return gray
+        previous = self.pool.get("diff_previous", gray.shape)
+        np.copyto(previous, gray)
+        return previous
+    
+    def apply(self, gray):
+        """Return a binary motion mask, or None while there is no reference frame"""
+        # Resolution changed (or first frame): restart the reference frame
+        if self.previous_frame is None or self.previous_frame.shape != gray.shape:
+            self.previous_frame = self._keep(gray)
+            return None
+        
+        frame_diff = cv2.absdiff(self.previous_frame, gray, dst=self.pool.get("diff", gray.shape))
+        thresh = cv2.threshold(frame_diff, self.threshold, 255, cv2.THRESH_BINARY,
+                               dst=self.pool.get("diff_mask", gray.shape))[1]
+        self.previous_frame = self._keep(gray)
+        return thresh
+
+class RunningAverageEngine:
+    """Motion mask against an exponentially weighted background model"""
+    def __init__(self, threshold=MOTION_DIFF_THRESHOLD, alpha=MOTION_BACKGROUND_ALPHA, pool=None):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.pool = pool or BufferPool()
+        self.background = None
+    
+    def apply(self, gray):
+        """Return a binary motion mask, or None while the model is being seeded"""
+        # The model itself persists across frames in either pool mode
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            return None
+        
+        background_u8 = cv2.convertScaleAbs(self.background, dst=self.pool.get("background_u8", gray.shape))
+        diff = cv2.absdiff(gray, background_u8, dst=self.pool.get("background_diff", gray.shape))
+        mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY,
+                             dst=self.pool.get("background_mask", gray.shape))[1]
+        
+        # Slow changes (lighting) are absorbed; a slumping person stays foreground
+        cv2.accumulateWeighted(gray, self.background, self.alpha)
+        return mask
+
+class Mog2Engine:
+    """Motion mask from OpenCV's Gaussian-mixture background subtractor"""
+    def __init__(self, threshold=MOTION_DIFF_THRESHOLD, alpha=MOTION_BACKGROUND_ALPHA, pool=None):
+        self.alpha = alpha
+        self.pool = pool or BufferPool()
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(varThreshold=threshold, detectShadows=False)
+        self.shape = None
+    
+    def apply(self, gray):
+        """Return a binary motion mask, or None while the model is being seeded"""
+        mask = self.pool.get("mog2_mask", gray.shape)
+        if self.shape != gray.shape:
+            self.shape = gray.shape
+            self.subtractor.clear()
+            self.subtractor.apply(gray, fgmask=mask, learningRate=1.0)
+            return None
+        
+        return self.subtractor.apply(gray, fgmask=mask, learningRate=self.alpha)
+
+MOTION_ENGINES = {
+    "frame_diff": FrameDiffEngine,
+    "running_average": RunningAverageEngine,
+    "mog2": Mog2Engine,
+}
+
+class VideoProcessor:
+    def __init__(self, analysis_size=MOTION_ANALYSIS_SIZE, frame_skip=MOTION_FRAME_SKIP,
+                 min_area=MOTION_MIN_AREA, engine=MOTION_ENGINE, buffer_pool=MOTION_BUFFER_POOL,
+                 async_analysis=MOTION_ASYNC_ANALYSIS, queue_size=MOTION_QUEUE_SIZE,
+                 drop_policy=MOTION_DROP_POLICY, shared_engine=MOTION_SHARED_ENGINE):
+        self.pool = BufferPool(enabled=buffer_pool)
+        self.engine = MOTION_ENGINES[engine](pool=self.pool)
+        self.stats = FrameStats()
         self.motion_detected = False
         self.motion_count = 0
         self.last_motion_time = None
         
+        # Analysis mode: detect on a downscaled proxy every Nth frame
+        self.analysis_size = analysis_size
+        self.frame_skip = max(1, int(frame_skip))
+        self.min_area = min_area
+        self.frame_index = 0
+        self.motion_boxes = []
+        
+        # motion_count counts debounced episodes rather than per-frame contours
+        self.camera_id = uuid.uuid4().hex
+        self.events = MotionEventTracker(self.camera_id)
+        
+        # Off-thread analysis: recv only downsizes and queues, the worker owns the pipeline
+        self.async_analysis = async_analysis
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.worker = None
+        
+        # Shared mode: frames go to the process-wide multi-camera engine instead
+        self.shared_engine = shared_engine
+        self.camera = None
+        self.camera_result = None
+        self.started = False
+    
+    def _start(self):
+        """Start the worker or join the shared engine on the first frame, so idle processors hold neither"""
+        self.started = True
+        if self.shared_engine:
+            self.camera = get_shared_engine().register(self.camera_id)
+        elif self.async_analysis:
+            self.worker = MotionAnalysisWorker(self._analyse_item, self._apply_result,
+                                               queue_size=self.queue_size, drop_policy=self.drop_policy,
+                                               on_discard=self._release_item)
+        
+    def _proxy_params(self, img):
+        """Return proxy size, full/proxy scale factors, blur kernel and area threshold"""
+        height, width = img.shape[:2]
+        if self.analysis_size is None:
+            return None, 1.0, 1.0, 21, self.min_area
+        
+        proxy_w, proxy_h = self.analysis_size
+        scale_x = width / proxy_w
+        scale_y = height / proxy_h
+        
+        # Keep the blur footprint and minimum area equivalent to full resolution
+        kernel = max(3, int(round(21 / scale_x)) | 1)
+        min_area = self.min_area / (scale_x * scale_y)
+        return (proxy_w, proxy_h), scale_x, scale_y, kernel, min_area
+    
+    def _downscale(self, img, proxy_size, dst=None):
+        """Resize to the proxy frame, into dst when given (queued proxies) or the pooled "small" buffer"""
+        if proxy_size is None:
+            if dst is None:
+                return img
+            np.copyto(dst, img)
+            return dst
+        
+        if dst is None:
+            dst = self.pool.get("small", (proxy_size[1], proxy_size[0], 3))
+        return cv2.resize(img, proxy_size, dst=dst, interpolation=cv2.INTER_AREA)
+    
+    def _queue_proxy(self, started, img):
+        """Downscale into a ring buffer and hand it to the worker
+        
+        queue_size + 2 buffers cover a full queue, the one being analysed and
+        the one being filled, so steady-state frames allocate nothing.
+        """
+        params = self._proxy_params(img)
+        shape = img.shape if params[0] is None else (params[0][1], params[0][0], 3)
+        proxy = self.pool.acquire("proxy", shape, self.worker.queue_size + 2)
+        if proxy is None:
+            self.worker.dropped += 1
+            return
+        self.worker.submit((started, self._downscale(img, params[0], dst=proxy), params))
+    
+    def _release_item(self, item):
+        """Return a queued proxy's buffer to the ring"""
+        self.pool.release("proxy", item[1])
+    
+    def detect_motion(self, img):
+        """Run motion detection and return bounding boxes in full-resolution coordinates"""
+        params = self._proxy_params(img)
+        return self._analyse(self._downscale(img, params[0]), params)
+    
+    def _analyse(self, small, params):
+        """Motion pipeline on an already downscaled frame"""
+        _, scale_x, scale_y, kernel, min_area = params
+        shape = small.shape[:2]
+        
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self.pool.get("gray", shape))
+        blurred = cv2.GaussianBlur(gray, (kernel, kernel), 0, dst=self.pool.get("blurred", shape))
+        
+        mask = self.engine.apply(blurred)
+        if mask is None:
+            return []
+        
+        # findContours leaves its input untouched (OpenCV >= 3.2), so no copy is needed
+        thresh = cv2.dilate(mask, None, dst=self.pool.get("dilated", shape), iterations=2)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        boxes = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            
+            (x, y, w, h) = cv2.boundingRect(contour)
+            boxes.append((int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y)))
+        return boxes
+    
+    def _analyse_item(self, item):
+        """Worker entry point"""
+        _, small, params = item
+        try:
+            return self._analyse(small, params)
+        finally:
+            self._release_item(item)
+    
+    def _record_motion(self, boxes, now=None):
+        """Publish boxes for the overlay and fold them into the current episode"""
+        now = now or datetime.now()
+        self.motion_boxes = boxes
+        self.motion_detected = bool(boxes)
+        if boxes:
+            self.last_motion_time = now
+        self.events.update(boxes, now)
+        self.motion_count = self.events.episode_count
+    
+    def _apply_result(self, item, boxes):
+        """Publish a completed analysis for the next recv to overlay"""
+        submitted_at = item[0]
+        self._record_motion(boxes)
+        self.stats.record_analysis((time.perf_counter() - submitted_at) * 1000)
+        
     def recv(self, frame):
         """Process video frame"""
+        started = time.perf_counter()
+        allocations_before = self.pool.allocations
         img = frame.to_ndarray(format="bgr24")
+        if not self.started:
+            self._start()
         
-        # Motion detection
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        # Motion detection (skipped frames reuse the previous boxes)
+        if self.camera:
+            if self.frame_index % self.frame_skip == 0:
+                get_shared_engine().submit_frame(self.camera.camera_id, img)
+            # Only a new batch result reaches the tracker, stamped with its analysis time
+            result = self.camera.result
+            if result is not None and result is not self.camera_result:
+                self.camera_result = result
+                self._record_motion(result[1], now=result[0])
+        elif self.frame_index % self.frame_skip == 0 and self.worker:
+            self._queue_proxy(started, img)
+            self.stats.dropped_frames = self.worker.dropped
+        elif self.frame_index % self.frame_skip == 0:
+            self._record_motion(self.detect_motion(img))
+        self.frame_index += 1
         
-        if self.previous_frame is None:
-            self.previous_frame = gray
-        else:
-            frame_diff = cv2.absdiff(self.previous_frame, gray)
-            thresh = cv2.threshold(frame_diff, 25, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
-            
-            contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            self.motion_detected = False
-            for contour in contours:
-                if cv2.contourArea(contour) < 1000:
-                    continue
-                    
-                self.motion_detected = True
-                self.motion_count += 1
-                self.last_motion_time = datetime.now()
-                
-                (x, y, w, h) = cv2.boundingRect(contour)
-                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                cv2.putText(img, "MOTION", (x, y-10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-            
-            self.previous_frame = gray
+        for (x, y, w, h) in list(self.motion_boxes):
+            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 255), 2)
+            cv2.putText(img, "MOTION", (x, y-10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
         
         # Add overlays
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -49,4 +423,16 @@ class VideoProcessor:
         cv2.putText(img, f"Motions: {self.motion_count}", (10, 60),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
+        # Annotations are drawn in place on the decoded frame, so no extra output copy
+        output = av.VideoFrame.from_ndarray(img, format="bgr24")
+        self.stats.record(self.pool.allocations - allocations_before,
+                          (time.perf_counter() - started) * 1000)
+        return output
+    
+    def on_ended(self):
+        """Called by streamlit-webrtc when the stream stops"""
+        if self.worker:
+            self.worker.stop()
+        if self.camera:
+            get_shared_engine().unregister(self.camera.camera_id)
+        self.events.close()